@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+
+# Import functions from the main script
+sys.path.insert(0, os.path.abspath('.'))
+import scraping.scrape_mtnpj_working as mp
+from scraping.replay_server import start_server, fixture_key
+
+# Benchmarks discovery strategies and processing modes against a fixture archive
+# replayed by scraping/replay_server.py, so runs are offline and reproducible:
+#   python3 scraping/bench_replay.py fixtures/castle-rock.jsonl.gz \
+#       https://www.mountainproject.com/area/105790784/castle-rock --latency-ms 80
+# Add --browser-profiles full lean for a before/after timing of the headless browser settings.
+
+DISCOVERY_STRATEGIES = list(mp.CRAWL_ORDERS) + ["fast"]
+MODES = ["sequential", "parallel", "async"]
+
+def reset_run_state(cache_dir):
+    """Start every measured run from an empty cache and fresh counters"""
+    mp.close_cache_stores()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    mp.CACHE_DIR = cache_dir
+    mp.page_store.clear()
+    mp.robots_cache.clear()
+    mp.rate_limiter.configure(mp.REQUESTS_PER_SECOND, mp.BURST_SIZE)
+    mp.fetch_stats.reset()
+
+def run_discovery(strategy, root_url, workers):
+    if strategy == "fast":
+        return mp.scrape_lowest_level_areas_parallel(root_url, max_workers=workers)
+    return mp.scrape_lowest_level_areas(root_url, order=strategy)
+
+def run_mode(mode, urls, workers):
+    if mode == "parallel":
+        return mp.process_parallel(urls, max_workers=workers)
+    if mode == "async":
+        return asyncio.run(mp.process_async(urls, concurrency=workers))
+    return [area for area in (mp.safe_get_routes(url) for url in urls) if area]
+
+def served_count(replay_stats):
+    """Everything the replay server answered, browser subresources included"""
+    return replay_stats.served + replay_stats.missing + replay_stats.injected_errors
+
+def measure(label, func, replay_stats):
+    """Run func and return (result, row) with pages/sec from the fetch layer's counters
+    plus the pages the browsers loaded"""
+    served_before = served_count(replay_stats)
+    browser_before = mp.driver_pool.pages_loaded
+    launched_before = mp.driver_pool.launched
+    start = time.monotonic()
+    result = func()
+    elapsed = time.monotonic() - start
+    browser_loads = mp.driver_pool.pages_loaded - browser_before
+    pages = mp.fetch_stats.requests + browser_loads
+    served = served_count(replay_stats) - served_before
+    row = (label, pages, browser_loads, served, elapsed, pages / elapsed if elapsed else 0.0)
+    logging.info(f"{label}: {mp.fetch_stats.summary()}; browsers {mp.driver_pool.summary()}; "
+                 f"memory cache {mp.memory_cache.summary()}")
+    if mp.USE_SELENIUM and mp.driver_pool.launched == launched_before and mp.driver_pool.launch_failed_at:
+        logging.warning(f"{label}: Chrome could not be started, so this run loaded no pages in a browser")
+    return result, row
+
+def print_report(rows):
+    print(f"\n{'run':<28}{'pages':>10}{'browser':>10}{'served':>10}{'seconds':>10}{'pages/s':>10}")
+    for label, pages, browser_loads, served, elapsed, rate in rows:
+        print(f"{label:<28}{pages:>10}{browser_loads:>10}{served:>10}{elapsed:>10.2f}{rate:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scraping modes against recorded fixtures')
+    parser.add_argument('fixtures', help='Fixture archive written by --record-fixtures')
+    parser.add_argument('root_url', help='Root area URL (live or replay form) to discover from')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the replay server')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Replay latency per response')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random extra replay latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of injected 429/503/500 responses')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES, help='Processing modes to measure')
+    parser.add_argument('--discovery', nargs='+', choices=DISCOVERY_STRATEGIES, default=DISCOVERY_STRATEGIES,
+                        help='Discovery strategies to measure')
+    parser.add_argument('-w', '--workers', type=int, default=mp.MAX_WORKERS, help='Workers / async concurrency')
+    parser.add_argument('--requests-per-second', type=float, default=1000.0,
+                        help='Rate limit used during the benchmark')
+    parser.add_argument('--selenium', action='store_true', help='Also drive Chrome for comments and stats')
+    parser.add_argument('--browser-profiles', nargs='+', choices=mp.BROWSER_PROFILES, default=None,
+                        help='Time each mode once per browser profile; implies --selenium and skips the '
+                             'HTTP-first path so every comment and stats page goes through Chrome')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
+
+    args = parser.parse_args()
+    mp.setup_logging(args.verbose)
+
+    server, replay_stats = start_server(args.fixtures, port=args.port, latency_ms=args.latency_ms,
+                                        jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    root_url = f"http://127.0.0.1:{args.port}{fixture_key(args.root_url)}"
+
+    mp.BASE_URL = root_url
+    mp.USE_SELENIUM = args.selenium or bool(args.browser_profiles)
+    if args.browser_profiles:
+        mp.HTTP_FIRST = False
+    mp.REQUESTS_PER_SECOND = args.requests_per_second
+    mp.BURST_SIZE = args.workers
+    mp.MAX_WORKERS = args.workers
+    mp.driver_pool.size = args.workers
+    cache_dir = tempfile.mkdtemp(prefix="mtnpj-bench-")
+
+    rows = []
+    lowest_level_urls = None
+    try:
+        for strategy in args.discovery:
+            reset_run_state(cache_dir)
+            urls, row = measure(f"discovery:{strategy}", lambda: run_discovery(strategy, root_url, args.workers),
+                                replay_stats)
+            rows.append(row)
+            lowest_level_urls = lowest_level_urls or urls
+
+        if lowest_level_urls is None:
+            lowest_level_urls = [root_url]
+        logging.info(f"Processing {len(lowest_level_urls)} lowest-level areas per mode")
+
+        for profile in args.browser_profiles or [None]:
+            if profile:
+                # Fresh browsers for each profile: the options are applied at launch
+                mp.cleanup_driver()
+                mp.BROWSER_PROFILE = profile
+            for mode in args.modes:
+                reset_run_state(cache_dir)
+                label = f"mode:{mode}/{profile}" if profile else f"mode:{mode}"
+                _, row = measure(label, lambda: run_mode(mode, lowest_level_urls, args.workers), replay_stats)
+                rows.append(row)
+    finally:
+        mp.cleanup_driver()
+        mp.close_cache_stores()
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print_report(rows)
+    print(f"\nReplay server: {replay_stats.served} served, {replay_stats.missing} missing, "
+          f"{replay_stats.injected_errors} injected errors")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
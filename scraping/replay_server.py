@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+# Serves a fixture archive recorded with
+#   python3 scraping/scrape_mtnpj_working.py <url> --record-fixtures fixtures/castle-rock.jsonl.gz
+# as a local stand-in for Mountain Project, e.g.
+#   python3 scraping/replay_server.py fixtures/castle-rock.jsonl.gz --port 8765 --latency-ms 80 --error-rate 0.02
+#   python3 scraping/scrape_mtnpj_working.py http://127.0.0.1:8765/area/105790784/castle-rock --no-selenium
+
+LIVE_ORIGINS = (
+    "https://www.mountainproject.com",
+    "http://www.mountainproject.com",
+    "https://mountainproject.com",
+    "http://mountainproject.com",
+)
+PERMISSIVE_ROBOTS = "User-agent: *\nDisallow:\n"
+
+def fixture_key(url):
+    """Key a recorded URL by path and query so it can be served from any host"""
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') or '/'
+    return f"{path}?{parts.query}" if parts.query else path
+
+def rewrite_origins(body, origin):
+    """Point absolute Mountain Project links at the replay server"""
+    for live_origin in LIVE_ORIGINS:
+        body = body.replace(live_origin, origin)
+    return body
+
+def load_fixtures(path, origin):
+    """Load a fixture archive into {key: {"raw": entry, "rendered": entry}}"""
+    fixtures = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            entry["body"] = rewrite_origins(entry["body"], origin)
+            variant = "rendered" if entry.get("rendered") else "raw"
+            # Later recordings of the same URL win
+            fixtures.setdefault(fixture_key(entry["url"]), {})[variant] = entry
+    return fixtures
+
+class ReplayStats:
+    """Counters reported when the server shuts down"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.served = 0
+        self.missing = 0
+        self.injected_errors = 0
+
+    def add(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+def make_handler(fixtures, latency, jitter, error_rate, stats):
+    """Build a request handler class bound to the loaded fixtures and settings"""
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+        def send_body(self, status, body, headers=None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                if key.lower() != "content-length":
+                    self.send_header(key, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(data)
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            # Simulated network and server latency
+            delay = latency + random.uniform(0, jitter)
+            if delay > 0:
+                time.sleep(delay)
+
+            key = fixture_key(self.path)
+            if key == "/robots.txt" and key not in fixtures:
+                self.send_body(200, PERMISSIVE_ROBOTS, {"Content-Type": "text/plain"})
+                return
+
+            if error_rate and random.random() < error_rate:
+                stats.add("injected_errors")
+                status = random.choice((429, 503, 500))
+                self.send_body(status, "Injected error", {"Retry-After": "1", "Content-Type": "text/plain"})
+                return
+
+            variants = fixtures.get(key)
+            if not variants:
+                stats.add("missing")
+                self.send_body(404, "Not recorded", {"Content-Type": "text/plain"})
+                return
+
+            # Headless Chrome gets the rendered page source, plain HTTP clients the raw HTML
+            wants_rendered = "HeadlessChrome" in self.headers.get("User-Agent", "")
+            entry = variants.get("rendered" if wants_rendered else "raw") or next(iter(variants.values()))
+
+            headers = dict(entry.get("headers") or {})
+            etag = headers.get("ETag") or headers.get("Etag")
+            if etag and self.headers.get("If-None-Match") == etag:
+                stats.add("served")
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            stats.add("served")
+            headers.setdefault("Content-Type", "text/html; charset=utf-8")
+            self.send_body(entry.get("status", 200), entry["body"], headers)
+
+    return ReplayHandler
+
+def start_server(fixture_path, host="127.0.0.1", port=8765, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+    """Start the replay server in a background thread; returns (server, stats)"""
+    origin = f"http://{host}:{port}"
+    fixtures = load_fixtures(fixture_path, origin)
+    logging.info(f"Loaded {len(fixtures)} recorded URLs from {fixture_path}")
+    stats = ReplayStats()
+    handler = make_handler(fixtures, latency_ms / 1000.0, jitter_ms / 1000.0, error_rate, stats)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded Mountain Project responses from a local server')
+    parser.add_argument('fixtures', help='Fixture archive written by --record-fixtures')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Fixed latency added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random extra latency up to this many ms')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with 429/503/500 instead of the recorded page')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible latency and errors')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server, stats = start_server(args.fixtures, args.host, args.port,
+                                 args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Replaying {args.fixtures} on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"Served {stats.served} responses, {stats.missing} missing, {stats.injected_errors} injected errors")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
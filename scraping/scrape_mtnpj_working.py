@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import requests
 from bs4 import BeautifulSoup
+from lxml import etree
 import json
 import sys
 import re
@@ -10,18 +11,47 @@ import os
 import logging
 import argparse
 import datetime
+import email.utils
 from pathlib import Path
 import hashlib
+import inspect
+import sqlite3
+import gzip
 import random
 from urllib.robotparser import RobotFileParser
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import asyncio
 import aiohttp
 import csv
 import tqdm
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urljoin, urlsplit, urlunsplit
 from functools import wraps
 import signal
+import threading
+import queue
+import heapq
+import itertools
+from collections import OrderedDict, Counter
+
+# Brotli is optional; urllib3 and aiohttp only decode "br" responses when it is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# zstandard is optional; without it cache payloads are stored as plain JSON
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# psutil is optional; without it browsers are only recycled by page count
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
 # --- Configure connection pooling ---
 from urllib3.util.retry import Retry
@@ -33,7 +63,10 @@ def create_session(pool_connections=100, pool_maxsize=100, max_retries=3):
     retry_strategy = Retry(
         total=max_retries,
         backoff_factor=0.5,
-        status_forcelist=[429, 500, 502, 503, 504],
+        # 429/503 are handled by the shared rate limiter so it can slow down; urllib3 would
+        # otherwise still retry them on its own whenever they carry Retry-After
+        status_forcelist=[500, 502, 504],
+        respect_retry_after_header=False,
     )
     adapter = HTTPAdapter(
         pool_connections=pool_connections,
@@ -53,8 +86,7 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import WebDriverException, TimeoutException
 
 # --- Global Login Credentials & Cookie File ---
 # Credentials are read from environment variables.
@@ -66,17 +98,100 @@ COOKIE_FILE = "cookies.json"
 OUTPUT_DIR = "data"  # or use absolute path like os.path.join(os.path.dirname(__file__), "data")
 CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
 CACHE_EXPIRY_DAYS = 7  # Cache entries older than this will be refreshed
+CACHE_DB_NAME = "cache.sqlite3"  # Single-file cache store inside CACHE_DIR
+CACHE_DATA_TYPES = ("html", "rendered", "comments", "stats", "route_details", "area")
+# Derived from page HTML and keyed by (content hash, extractor version) rather than URL
+DERIVED_DATA_TYPES = ("route_details", "area")
+EXTRACTOR_VERSION = 1  # Bump when extraction output changes without the extractor source changing
+CACHE_COMPRESSION = True  # zstd-compress cache payloads when the zstandard package is installed
+CACHE_COMPRESSION_LEVEL = 3
+CACHE_DICT_SIZE = 112640  # Bytes of the zstd dictionary trained on our own cached pages
+CACHE_DICT_SAMPLES = 2000  # Cached entries used to train a dictionary
+# Per data_type retention: entries older than max_age_days are deleted by garbage collection,
+# and once a type exceeds max_mb its least recently used entries are evicted. Expired entries
+# (older than CACHE_EXPIRY_DAYS) are kept until max_age_days so they can still be revalidated.
+CACHE_LIMITS = {
+    "html": {"max_age_days": 60, "max_mb": 8192},
+    "rendered": {"max_age_days": 60, "max_mb": 8192},  # Browser page sources behind comments and stats
+    "comments": {"max_age_days": 60, "max_mb": 1024},
+    "stats": {"max_age_days": 60, "max_mb": 1024},
+    # Content-addressed: never stale, removed once their page or extractor version is gone
+    "route_details": {"max_age_days": None, "max_mb": 2048},
+    "area": {"max_age_days": None, "max_mb": 1024},
+}
+CACHE_GC_INTERVAL = 3600  # Seconds between automatic garbage collections during a run (0 disables)
+CACHE_ACCESS_RESOLUTION = 3600  # last_access is only rewritten when older than this many seconds
+PAGE_STORE_MAX_PAGES = 100  # Parsed leaf-area pages kept in memory between discovery and extraction
+MEMORY_CACHE_MAX_ENTRIES = 5000  # Decoded cache entries kept in memory in front of the SQLite store
+MEMORY_CACHE_MAX_MB = 256  # Approximate memory budget for those entries (0 disables the tier)
 
-# Global selenium driver for reuse
-global_driver = None
+USE_SELENIUM = True  # Set to False to skip browser-only data (comments, stats) entirely
+SELENIUM_WAIT_TIMEOUT = 10.0  # Seconds a browser may spend on one page: loading plus every wait on it
+SELENIUM_POLL_INTERVAL = 0.2  # How often waits re-check the page
+COMMENTS_STABLE_SECONDS = 0.6  # The comment count must hold this long before the list counts as loaded
+COMMENTS_ABSENT_GRACE = 2.0  # After the page has loaded, give up on a comment list that never appears
+MAX_SHOW_MORE_CLICKS = 20  # Bound on "show more comments" clicks per page
+HTTP_FIRST = True  # Try comments and stats over plain HTTP before falling back to the browser
+# Endpoint the route and area pages load their comments from
+COMMENTS_ENDPOINT = "/comments/forObject/{model}/{page_id}?sortOrder=oldest&showAll=true"
+COMMENT_MODELS = {"route": "Climb-Lib-Models-Route", "area": "Climb-Lib-Models-Area"}
+# Section headings of a server-rendered stats page; without any of them the page is not the stats
+# (rendered by script, a login or consent wall, a changed layout) and the browser is tried instead
+STATS_PAGE_HEADINGS = ("Star Ratings", "Suggested Ratings", "On To-Do Lists", "Ticks")
+OFFLINE = False  # Serve everything from the cache regardless of age; never touch the network
+STALE_WHILE_REVALIDATE = False  # Serve expired cache entries at once and refresh them in the background
+REVALIDATE_WORKERS = 2  # Background refresh threads (requests still go through the shared rate limiter)
+SELENIUM_POOL_SIZE = None  # Browsers shared by the workers (defaults to the worker count)
+DRIVER_MAX_PAGES = 200  # A browser is restarted after this many pages to shed leaked memory
+DRIVER_MAX_RSS_MB = 1536  # ...or once chromedriver and its Chrome processes use this much memory (0 disables)
+DRIVER_HEALTH_CHECK_IDLE = 60  # A browser idle this many seconds is probed before being handed out
+DRIVER_LAUNCH_BACKOFF = 60  # Seconds before trying to start Chrome again after it failed to launch
+BROWSER_PROFILES = ("lean", "full")
+BROWSER_PROFILE = "lean"  # lean: no images, fonts, ads or analytics, and pages count as loaded at DOMContentLoaded
+# Requests the lean profile blocks through the DevTools protocol (Network.setBlockedURLs wildcards)
+BLOCKED_URL_PATTERNS = (
+    # Images and fonts: nothing we extract is drawn
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*use.typekit.net*",
+    # Ad networks, analytics and other third-party scripts
+    "*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*", "*adservice.google.*",
+    "*googletagmanager.com*", "*googletagservices.com*", "*google-analytics.com*",
+    "*amazon-adsystem.com*", "*adsafeprotected.com*", "*moatads.com*", "*pubmatic.com*",
+    "*rubiconproject.com*", "*casalemedia.com*", "*openx.net*", "*criteo.com*", "*taboola.com*",
+    "*scorecardresearch.com*", "*quantserve.com*", "*quantcount.com*", "*chartbeat.com*",
+    "*connect.facebook.net*", "*hotjar.com*", "*newrelic.com*", "*nr-data.net*",
+)
 
 # --- Rate Limiting, Batch Processing, and Parallelism Configuration ---
 REQUEST_DELAY = 1.0  # Default delay between requests in seconds
+REQUESTS_PER_SECOND = None  # Token bucket refill rate (defaults to 1 / REQUEST_DELAY)
+BURST_SIZE = 1  # Number of requests allowed back-to-back before throttling
+THROTTLE_STATUS_CODES = (429, 503)  # Responses that make the rate limiter slow down
+REQUEST_TIMEOUT = 30  # Seconds to wait for a page before giving up
+STREAMING_PARSE = False  # Parse pages while they download and stop once the extracted fields are read
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes fed to the incremental parser at a time
+# Elements that only appear after everything the HTTP extractors read (breadcrumbs,
+# sub-area nav, left-nav-route-table, description sections): (tag, attribute, value substring)
+STREAM_STOP_MARKERS = (
+    ("div", "class", "comment-list"),
+    ("div", "id", "comments"),
+    ("footer", None, None),
+)
+KEEP_FULL_HTML = False  # Cache pages as received instead of sanitized (for debugging extractors)
+# Elements no extractor reads; dropped (with their contents) before pages are cached
+SANITIZE_DROP_TAGS = ("script", "style", "noscript", "iframe", "svg", "link", "meta", "template", "head", "footer")
+# The only attributes extractors look at; everything else is stripped
+SANITIZE_KEEP_ATTRIBUTES = frozenset(("id", "class", "href", "target", "data-lr"))
 MAX_RETRIES = 3  # Maximum number of retries for failed requests
 RETRY_BACKOFF_FACTOR = 2  # Exponential backoff factor for retries
 BATCH_SIZE = 10  # Number of areas to process in each batch
 CHECKPOINT_FILE = "checkpoint.json"  # File to store progress
 MAX_WORKERS = 4  # Maximum number of concurrent workers for parallel processing
+CRAWL_ORDER = "dfs"  # Discovery order: dfs (link order), depth (shallow areas first) or page-views
+EXTRA_ROOTS = 0  # Number of additional root URLs crawled together with BASE_URL
+MP_ORIGIN = "https://www.mountainproject.com"  # Relative links are resolved against this
+MP_HOSTS = ("www.mountainproject.com", "mountainproject.com")
 RESPECT_ROBOTS_TXT = True  # Whether to respect robots.txt
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -86,8 +201,8 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:90.0) Gecko/20100101 Firefox/90.0"
 ]
 
-# Cache of robots.txt parsers for different domains
-robots_cache = {}
+ROBOTS_CACHE_TTL = 24 * 3600  # Seconds before a domain's robots.txt is fetched again
+ROBOTS_FAILURE_TTL = 300  # Seconds before retrying a robots.txt that could not be fetched
 
 # --- Logging Setup ---
 def setup_logging(verbose=False):
@@ -104,24 +219,94 @@ def get_random_user_agent():
     """Return a random user agent from the list"""
     return random.choice(USER_AGENTS)
 
-def get_robots_parser(url):
-    """Get or create a robots.txt parser for the given URL"""
-    parsed_url = urlparse(url)
-    domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
-    
-    if domain not in robots_cache:
+class RobotsCache:
+    """Thread-safe robots.txt cache with a TTL per domain.
+
+    Lookups of a fresh entry are a plain dict read. On a miss only one thread
+    per domain fetches robots.txt (concurrent lookups wait for it), failures are
+    retried after ROBOTS_FAILURE_TTL, and any Crawl-delay is fed into the shared
+    rate limiter.
+    """
+
+    def __init__(self, ttl=ROBOTS_CACHE_TTL, failure_ttl=ROBOTS_FAILURE_TTL):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.entries = {}  # domain -> (parser, expires_at)
+        self.domain_locks = {}
+        self.lock = threading.Lock()
+
+    def get_fresh(self, domain):
+        """Return the cached parser for domain if it has not expired, else None"""
+        entry = self.entries.get(domain)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def get(self, url):
+        """Get or fetch the robots.txt parser for the URL's domain"""
+        domain = get_domain(url)
+        parser = self.get_fresh(domain)
+        if parser is not None:
+            return parser
+        
+        with self.lock:
+            domain_lock = self.domain_locks.setdefault(domain, threading.Lock())
+        with domain_lock:
+            # Another thread may have fetched it while we were waiting
+            parser = self.get_fresh(domain)
+            if parser is None:
+                parser, ttl = self.fetch(domain)
+                self.entries[domain] = (parser, time.monotonic() + ttl)
+            return parser
+
+    def fetch(self, domain):
+        """Fetch and parse robots.txt for a domain; returns (parser, ttl)"""
         rp = RobotFileParser()
         rp.set_url(f"{domain}/robots.txt")
         try:
-            rp.read()
-            robots_cache[domain] = rp
+            response = requests_session.get(rp.url, headers=build_request_headers(), timeout=REQUEST_TIMEOUT)
+            if response.status_code in (401, 403):
+                rp.disallow_all = True
+            elif 400 <= response.status_code < 500:
+                rp.allow_all = True
+            else:
+                response.raise_for_status()
+                record_fixture(rp.url, response.status_code, response.headers, response.text)
+                rp.parse(response.text.splitlines())
+                apply_crawl_delay(domain, rp)
+            return rp, self.ttl
         except Exception as e:
             logging.warning(f"Error reading robots.txt for {domain}: {e}")
-            # Create a permissive parser as fallback
+            # Be permissive until the next retry
             rp = RobotFileParser()
-            robots_cache[domain] = rp
-    
-    return robots_cache[domain]
+            rp.allow_all = True
+            return rp, self.failure_ttl
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+# Cache of robots.txt parsers for different domains
+robots_cache = RobotsCache()
+
+def get_domain(url):
+    """Return scheme://netloc for a URL"""
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+def apply_crawl_delay(domain, rp):
+    """Slow the shared rate limiter down to the site's Crawl-delay / Request-rate, if any"""
+    min_interval = rp.crawl_delay("*")
+    request_rate = rp.request_rate("*")
+    if request_rate and request_rate.requests:
+        min_interval = max(min_interval or 0, request_rate.seconds / request_rate.requests)
+    if min_interval:
+        rate_limiter.limit_rate(1.0 / float(min_interval))
+        logging.info(f"robots.txt for {domain} asks for {float(min_interval):.2f}s between requests")
+
+def get_robots_parser(url):
+    """Get or create a robots.txt parser for the given URL"""
+    return robots_cache.get(url)
 
 def can_fetch(url, user_agent):
     """Check if the URL is allowed to be fetched according to robots.txt"""
@@ -135,53 +320,937 @@ def can_fetch(url, user_agent):
         logging.warning(f"Error checking robots.txt for {url}: {e}")
         return True  # If there's an error, we'll be permissive
 
-def rate_limited_request(url, headers=None, delay=None):
-    """Make a rate-limited request with respect to robots.txt"""
+class TokenBucket:
+    """Process-wide token bucket shared by threads, the async path and discovery.
+
+    Each caller reserves a token under a lock and then sleeps outside of it, so
+    concurrent workers are spaced out evenly instead of bursting. On 429/503 the
+    rate is halved (and Retry-After honored); successful responses slowly raise
+    it back towards the configured rate.
+    """
+
+    def __init__(self, rate, burst=1, min_rate=0.05, recovery_factor=1.05):
+        self.lock = threading.Lock()
+        self.min_rate = min_rate
+        self.recovery_factor = recovery_factor
+        self.updated = time.monotonic()  # Refill time; penalize() moves it past the end of a pause
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst=None):
+        """Set the target rate (requests/second) and burst size"""
+        with self.lock:
+            self.max_rate = max(rate, self.min_rate)
+            self.rate = self.max_rate
+            if burst is not None:
+                self.burst = max(1, burst)
+            self.tokens = self.burst
+
+    def _reserve(self):
+        """Take a token and return how long the caller has to wait for it"""
+        with self.lock:
+            now = time.monotonic()
+            if now > self.updated:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            self.tokens -= 1
+            # Tokens only start refilling at `updated`, so callers queued during a
+            # pause are spaced out after it instead of all being released at its end
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return wait + (self.updated - now)
+
+    def acquire(self):
+        """Block the calling thread until a request may be sent"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a request may be sent"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, retry_after=None):
+        """Slow down after the server signalled overload (429/503)"""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            # One request may go when the pause ends; the rest follow at the lowered rate
+            self.tokens = 1
+            self.updated = max(self.updated, time.monotonic() + pause)
+            logging.warning(f"Server is throttling us, rate lowered to {self.rate:.2f} req/s (pausing {pause:.1f}s)")
+
+    def limit_rate(self, max_rate):
+        """Cap the rate (e.g. from a robots.txt Crawl-delay); never raises it"""
+        with self.lock:
+            self.max_rate = max(self.min_rate, min(self.max_rate, max_rate))
+            self.rate = min(self.rate, self.max_rate)
+
+    def reward(self):
+        """Recover the rate gradually after a successful request"""
+        if self.rate >= self.max_rate:
+            return
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * self.recovery_factor)
+
+# Shared by every fetch path; reconfigured from the command line in main()
+rate_limiter = TokenBucket(1.0 / REQUEST_DELAY, BURST_SIZE)
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.datetime.now(retry_at.tzinfo)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class FetchStats:
+    """Thread-safe per-request timing and transfer counters for the fetch layer"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.requests = 0
+            self.errors = 0
+            self.throttled = 0
+            self.bytes = 0
+            self.latencies = []
+
+    def add_bytes(self, nbytes):
+        """Count bytes of a streamed body that were read after the request was recorded"""
+        with self.lock:
+            self.bytes += nbytes
+
+    def record(self, url, status, elapsed, nbytes):
+        with self.lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.latencies.append(elapsed)
+            if status in THROTTLE_STATUS_CODES:
+                self.throttled += 1
+            elif status is None or status >= 400:
+                self.errors += 1
+        logging.debug(f"GET {url} -> {status} in {elapsed:.3f}s ({nbytes / 1024:.1f} KB)")
+
+    def summary(self):
+        """Return a one-line summary of the requests made so far"""
+        with self.lock:
+            wall = max(time.monotonic() - self.started, 1e-9)
+            latencies = sorted(self.latencies)
+            if latencies:
+                p50 = latencies[len(latencies) // 2]
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            else:
+                p50 = p95 = 0.0
+            return (f"{self.requests} requests in {wall:.1f}s ({self.requests / wall:.2f} pages/s), "
+                    f"p50 {p50:.3f}s, p95 {p95:.3f}s, {self.bytes / 1048576:.1f} MB, "
+                    f"{self.errors} errors, {self.throttled} throttled")
+
+fetch_stats = FetchStats()
+
+class FixtureRecorder:
+    """Append every response we receive to a gzip JSON-lines fixture archive.
+
+    The archive is replayed by scraping/replay_server.py. Browser-rendered page
+    sources are stored with rendered=True so the replay server can serve them to
+    headless Chrome and the raw HTML to plain HTTP clients.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.count = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def record(self, url, status, headers, body, rendered=False):
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": {key: value for key, value in (headers or {}).items()
+                        if key.lower() in ("content-type", "etag", "last-modified")},
+            "body": body,
+            "rendered": rendered,
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.lock:
+            # Each append is its own gzip member; gzip.open reads them back as one stream
+            with gzip.open(self.path, "ab") as f:
+                f.write(line)
+            self.count += 1
+
+# Set by --record-fixtures; None means nothing is recorded
+fixture_recorder = None
+
+def record_fixture(url, status, headers, body, rendered=False):
+    """Record a response to the fixture archive when recording is enabled"""
+    if fixture_recorder is not None:
+        fixture_recorder.record(url, status, headers, body, rendered)
+
+def build_request_headers(user_agent=None):
+    """Default headers for every page fetch"""
+    return {
+        "User-Agent": user_agent or get_random_user_agent(),
+        "Accept-Encoding": ACCEPT_ENCODING,
+    }
+
+async def async_can_fetch(url, user_agent):
+    """can_fetch for the event loop: robots.txt is only fetched (in a thread) on a cache miss"""
+    if not RESPECT_ROBOTS_TXT:
+        return True
+    if robots_cache.get_fresh(get_domain(url)) is None:
+        return await asyncio.to_thread(can_fetch, url, user_agent)
+    return can_fetch(url, user_agent)
+
+def rate_limited_request(url, headers=None, delay=None, stream=False):
+    """Fetch a page through the shared fetch layer.
+
+    Every page load goes through here: robots.txt check, the shared token
+    bucket, the pooled keep-alive session (with its Retry policy), 429/503
+    slow-down and per-request timing. With stream=True the body is left unread
+    for read_streaming_html.
+    """
     if headers is None:
-        user_agent = get_random_user_agent()
-        headers = {"User-Agent": user_agent}
+        headers = build_request_headers()
     else:
-        user_agent = headers.get("User-Agent", get_random_user_agent())
+        headers = {**build_request_headers(headers.get("User-Agent")), **headers}
+    user_agent = headers["User-Agent"]
     
     if RESPECT_ROBOTS_TXT and not can_fetch(url, user_agent):
         logging.warning(f"robots.txt disallows fetching {url}")
         raise PermissionError(f"robots.txt disallows fetching {url}")
     
-    # Apply rate limiting
-    actual_delay = delay if delay is not None else REQUEST_DELAY
-    if actual_delay > 0:
-        time.sleep(actual_delay)
+    for attempt in range(MAX_RETRIES + 1):
+        # An explicit delay overrides the shared token bucket
+        if delay is not None:
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            rate_limiter.acquire()
+        
+        # Use the global session instead of creating a new one each time
+        start = time.monotonic()
+        try:
+            response = requests_session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=stream)
+        except requests.RequestException:
+            fetch_stats.record(url, None, time.monotonic() - start, 0)
+            raise
+        fetch_stats.record(url, response.status_code, time.monotonic() - start, 0 if stream else len(response.content))
+        
+        if response.status_code not in THROTTLE_STATUS_CODES:
+            rate_limiter.reward()
+            return response
+        
+        response.close()
+        rate_limiter.penalize(parse_retry_after(response.headers.get("Retry-After")))
+        logging.debug(f"Got {response.status_code} for {url} (attempt {attempt + 1}/{MAX_RETRIES + 1})")
     
-    # Use the global session instead of creating a new one each time
-    return requests_session.get(url, headers=headers)
+    return response
+
+class StreamingHtmlReader:
+    """Incrementally parse a page as it downloads and tell the caller when to stop.
+
+    Chunks are fed into lxml's HTMLPullParser; as soon as the start tag of one of
+    STREAM_STOP_MARKERS is seen, everything the extractors need has been read and
+    the rest of the page (comments, footer, trailing scripts) can be skipped.
+    get_html then cuts the page right before that tag, so a section that was only
+    partly downloaded never reaches the cache looking complete. Elements are
+    cleared once parsed, so the pull parser's own tree stays small.
+    """
+
+    def __init__(self, stop_markers=None):
+        self.stop_markers = STREAM_STOP_MARKERS if stop_markers is None else stop_markers
+        self.parser = etree.HTMLPullParser(events=("start", "end"))
+        self.chunks = []
+        self.stop_marker = None  # The marker that ended the read, once one has
+
+    def get_stop_marker(self, element):
+        for marker in self.stop_markers:
+            tag, attribute, value = marker
+            if element.tag != tag:
+                continue
+            if attribute is None or value in (element.get(attribute) or ""):
+                return marker
+        return None
+
+    @staticmethod
+    def find_start_tag(data, marker):
+        """Byte offset of the first start tag matching marker in data, or None"""
+        tag, attribute, value = marker
+        pattern = rb"<" + re.escape(tag.encode()) + rb"(?![\w-])"
+        if attribute is not None:
+            pattern += (rb"[^>]*?(?<![\w-])" + re.escape(attribute.encode())
+                        + rb"\s*=\s*[\"']?[^\"'>]*?" + re.escape(value.encode()))
+        match = re.search(pattern, data, re.IGNORECASE)
+        return match.start() if match else None
+
+    def feed(self, chunk):
+        """Feed a chunk of the body; returns True once the rest of the page can be skipped"""
+        self.chunks.append(chunk)
+        self.parser.feed(chunk)
+        for event, element in self.parser.read_events():
+            if event == "start":
+                self.stop_marker = self.get_stop_marker(element)
+                if self.stop_marker:
+                    return True
+            if event == "end":
+                element.clear()
+        return False
+
+    def get_html(self, encoding=None):
+        data = b"".join(self.chunks)
+        if self.stop_marker:
+            offset = self.find_start_tag(data, self.stop_marker)
+            if offset is not None:
+                data = data[:offset]
+        return data.decode(encoding or "utf-8", errors="replace")
+
+def read_streaming_html(response, url):
+    """Read a streamed requests response, stopping early at the first stop marker"""
+    reader = StreamingHtmlReader()
+    nbytes = 0
+    try:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            nbytes += len(chunk)
+            if reader.feed(chunk):
+                logging.debug(f"Stopped reading {url} early after {nbytes / 1024:.1f} KB")
+                break
+    finally:
+        # Closing an unfinished body drops the connection instead of returning it to the pool
+        response.close()
+        fetch_stats.add_bytes(nbytes)
+    return reader.get_html(response.encoding)
+
+# --- URL Canonicalization ---
+MP_PAGE_PATTERN = re.compile(r"^/(area|route)(/stats)?/(\d+)(?=/|$)")
+
+def normalize_url(url, base=None):
+    """Absolute, fetchable form of a link: resolved against base (or MP_ORIGIN), Mountain
+    Project hosts forced to https://www, fragment and trailing slash dropped"""
+    parts = urlsplit(urljoin(base or MP_ORIGIN, url.strip()))
+    scheme, host = parts.scheme.lower(), parts.netloc.lower()
+    if host in MP_HOSTS:
+        scheme, host = urlsplit(MP_ORIGIN)[:2]
+    return urlunsplit((scheme, host, parts.path.rstrip('/') or '/', parts.query, ''))
+
+def canonicalize_url(url):
+    """Identity of the page a URL names, as (kind, id).
+
+    Mountain Project area, route and route-stats pages reduce to their numeric id,
+    so slug changes, http/https, trailing slashes and query strings all map to the
+    same page, e.g. ("route", "105748496"). Other hosts (replay or test servers)
+    keep the host in the kind so they never share entries with the live site;
+    anything else falls back to the normalized URL.
+    """
+    parts = urlsplit(normalize_url(url))
+    match = MP_PAGE_PATTERN.match(parts.path)
+    if match:
+        kind = match.group(1) + ("-stats" if match.group(2) else "")
+        if parts.netloc not in MP_HOSTS:
+            kind = f"{parts.netloc}/{kind}"
+        return kind, match.group(3)
+    return "url", urlunsplit(parts)
+
+def get_stats_url(route_url):
+    """URL of a route's stats page (suggested ratings and ticks)"""
+    parts = urlsplit(normalize_url(route_url))
+    match = MP_PAGE_PATTERN.match(parts.path)
+    if not match or match.group(1) != "route" or match.group(2):
+        return route_url
+    path = f"/route/stats/{match.group(3)}{parts.path[match.end():]}"
+    return urlunsplit((parts.scheme, parts.netloc, path, '', ''))
 
 # --- Caching Functions ---
+class LRUCache:
+    """Bounded, thread-safe in-memory LRU keyed by any hashable.
+
+    Capped by entry count and, when a size is given on put, by total bytes.
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def pop(self, key):
+        """Remove and return the value for key, or None (counts as a hit or miss)"""
+        with self.lock:
+            item = self.entries.pop(key, None)
+            if item is None:
+                self.misses += 1
+                return None
+            self.total_bytes -= item[1]
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size=0):
+        if self.max_entries <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or (
+                    self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def discard(self, key):
+        with self.lock:
+            item = self.entries.pop(key, None)
+            if item is not None:
+                self.total_bytes -= item[1]
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def summary(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+            return (f"{self.hits} hits, {self.misses} misses ({hit_rate:.0f}%), "
+                    f"{len(self.entries)} entries, {self.total_bytes / 1048576:.1f} MB")
+
 def get_cache_key(url):
-    """Generate a cache key from a URL"""
-    return hashlib.md5(url.encode()).hexdigest()
+    """Generate a cache key from the canonical identity of a URL"""
+    kind, page_id = canonicalize_url(url)
+    return hashlib.md5(f"{kind}:{page_id}".encode()).hexdigest()
+
+class CacheStore:
+    """Single-file SQLite cache indexed by URL, data_type and timestamp.
+
+    Replaces the old data/cache/<type>/<md5>.json layout. WAL mode lets readers
+    run alongside a writer, and busy_timeout makes writers from other threads or
+    from the processes multi_scrape.sh starts wait instead of failing. Every
+    thread (and every forked process) opens its own connection.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            data_type TEXT NOT NULL,
+            cache_key TEXT NOT NULL,
+            url TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            content TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            PRIMARY KEY (data_type, cache_key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_cache_entries_timestamp ON cache_entries (data_type, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_cache_entries_url ON cache_entries (url);
+        CREATE TABLE IF NOT EXISTS cache_dictionaries (
+            dict_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_type TEXT NOT NULL,
+            created REAL NOT NULL,
+            dictionary BLOB NOT NULL
+        );
+    """
+    # Stored as PRAGMA user_version; bump when get_cache_key changes so entries are rekeyed
+    KEY_VERSION = 1
+    # Columns added after the first release of the store: name -> definition
+    UPGRADE_COLUMNS = {
+        "encoding": "TEXT NOT NULL DEFAULT 'json'",
+        "last_access": "REAL NOT NULL DEFAULT 0",
+        "size": "INTEGER NOT NULL DEFAULT 0",
+        "content_hash": "TEXT",  # sha256 of raw HTML entries
+    }
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.generation = 0
+
+    def connect(self):
+        """Return this thread's connection, opening it (and the schema) on first use"""
+        conn = getattr(self.local, "conn", None)
+        if conn is not None and self.local.pid == os.getpid() and self.local.generation == self.generation:
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=60000")
+        # Only takes effect for a new database; lets gc hand freed pages back to the filesystem
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.executescript(self.SCHEMA)
+        self.upgrade_schema(conn)
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        self.local.generation = self.generation
+        with self.lock:
+            self.connections.append(conn)
+        return conn
+
+    def upgrade_schema(self, conn):
+        """Add columns that older cache databases are missing"""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")}
+        for column, definition in self.UPGRADE_COLUMNS.items():
+            if column not in existing:
+                try:
+                    conn.execute(f"ALTER TABLE cache_entries ADD COLUMN {column} {definition}")
+                except sqlite3.OperationalError:
+                    pass  # Another connection added it first
+        if "size" not in existing:
+            # Backfill accounting for entries written before sizes were tracked
+            conn.execute("UPDATE cache_entries SET size = length(content), last_access = timestamp WHERE size = 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_access ON cache_entries (data_type, last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_hash ON cache_entries (content_hash)")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < self.KEY_VERSION:
+            self.rekey(conn)
+
+    def rekey(self, conn):
+        """Move URL-keyed entries to the current get_cache_key scheme, keeping the newest
+        entry when several old URLs now name the same page"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= self.KEY_VERSION:
+                conn.execute("ROLLBACK")
+                return  # Another connection got here first
+            placeholders = ", ".join("?" * len(DERIVED_DATA_TYPES))
+            rows = conn.execute(
+                f"SELECT data_type, cache_key, url FROM cache_entries WHERE data_type NOT IN ({placeholders}) "
+                "ORDER BY timestamp", DERIVED_DATA_TYPES
+            ).fetchall()
+            for data_type, cache_key, url in rows:
+                new_key = get_cache_key(url)
+                if new_key != cache_key:
+                    conn.execute("UPDATE OR REPLACE cache_entries SET cache_key = ? WHERE data_type = ? AND cache_key = ?",
+                                 (new_key, data_type, cache_key))
+            conn.execute(f"PRAGMA user_version = {self.KEY_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- Payload encoding ---
+    # Payloads are JSON, optionally zstd-compressed. The encoding column says how:
+    # 'json', 'zstd' or 'zstd-dict:<dict_id>' (compressed with a trained dictionary).
+
+    def codecs(self):
+        """Per-thread zstd (de)compressors, keyed by dictionary id (None = no dictionary)"""
+        codecs = getattr(self.local, "codecs", None)
+        if codecs is None or self.local.codecs_generation != self.generation:
+            codecs = self.local.codecs = {}
+            self.local.codecs_generation = self.generation
+        return codecs
+
+    def get_codec(self, dict_id):
+        codecs = self.codecs()
+        if dict_id not in codecs:
+            if dict_id is None:
+                compressor = zstandard.ZstdCompressor(level=CACHE_COMPRESSION_LEVEL)
+                decompressor = zstandard.ZstdDecompressor()
+            else:
+                row = self.connect().execute(
+                    "SELECT dictionary FROM cache_dictionaries WHERE dict_id = ?", (dict_id,)
+                ).fetchone()
+                if row is None:
+                    raise KeyError(f"Unknown cache dictionary {dict_id}")
+                dictionary = zstandard.ZstdCompressionDict(row[0])
+                compressor = zstandard.ZstdCompressor(level=CACHE_COMPRESSION_LEVEL, dict_data=dictionary)
+                decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            codecs[dict_id] = (compressor, decompressor)
+        return codecs[dict_id]
 
-def get_cache_path(url, data_type="html"):
-    """Get the path where the cached file should be stored"""
-    cache_key = get_cache_key(url)
-    cache_dir = os.path.join(CACHE_DIR, data_type)
-    os.makedirs(cache_dir, exist_ok=True)
-    return os.path.join(cache_dir, f"{cache_key}.json")
+    def latest_dictionary_id(self, data_type):
+        """Id of the newest trained dictionary for a data_type (cached per thread)"""
+        codecs = self.codecs()
+        key = ("latest", data_type)
+        if key not in codecs:
+            row = self.connect().execute(
+                "SELECT MAX(dict_id) FROM cache_dictionaries WHERE data_type = ?", (data_type,)
+            ).fetchone()
+            codecs[key] = row[0]
+        return codecs[key]
 
-def get_from_cache(url, data_type="html"):
+    def encode(self, data_type, content):
+        """Serialize content for storage; returns (payload, encoding)"""
+        payload = json.dumps(content, ensure_ascii=False)
+        if not (CACHE_COMPRESSION and zstandard):
+            return payload, "json"
+        dict_id = self.latest_dictionary_id(data_type)
+        compressor, _ = self.get_codec(dict_id)
+        compressed = compressor.compress(payload.encode("utf-8"))
+        return compressed, "zstd" if dict_id is None else f"zstd-dict:{dict_id}"
+
+    def decode_text(self, payload, encoding):
+        """Decompress a stored payload back to its JSON text"""
+        if encoding == "json":
+            return payload
+        if zstandard is None:
+            raise RuntimeError("Cache entry is zstd-compressed but the zstandard package is not installed")
+        dict_id = int(encoding.split(":", 1)[1]) if encoding.startswith("zstd-dict:") else None
+        _, decompressor = self.get_codec(dict_id)
+        return decompressor.decompress(payload).decode("utf-8")
+
+    def decode(self, payload, encoding):
+        """Inverse of encode"""
+        return json.loads(self.decode_text(payload, encoding))
+
+    def train_dictionary(self, data_type, samples=CACHE_DICT_SAMPLES, dict_size=CACHE_DICT_SIZE):
+        """Train a zstd dictionary on a sample of cached entries and store it; returns its id"""
+        rows = self.connect().execute(
+            "SELECT content, encoding FROM cache_entries WHERE data_type = ? ORDER BY RANDOM() LIMIT ?",
+            (data_type, samples)
+        ).fetchall()
+        training_data = [json.dumps(self.decode(payload, encoding), ensure_ascii=False).encode("utf-8")
+                         for payload, encoding in rows]
+        if len(training_data) < 10:
+            raise ValueError(f"Need at least 10 cached {data_type} entries to train a dictionary, have {len(training_data)}")
+        dictionary = zstandard.train_dictionary(dict_size, training_data)
+        cursor = self.connect().execute(
+            "INSERT INTO cache_dictionaries (data_type, created, dictionary) VALUES (?, ?, ?)",
+            (data_type, time.time(), dictionary.as_bytes())
+        )
+        # New writes on this thread pick the new dictionary up immediately; other threads on reconnect
+        self.codecs().pop(("latest", data_type), None)
+        return cursor.lastrowid
+
+    def recompress(self, data_type, batch_size=500):
+        """Re-encode every entry of a data_type with the current settings; returns (old_bytes, new_bytes)"""
+        conn = self.connect()
+        old_bytes = new_bytes = 0
+        last_key = ""
+        while True:
+            rows = conn.execute(
+                "SELECT cache_key, content, encoding FROM cache_entries "
+                "WHERE data_type = ? AND cache_key > ? ORDER BY cache_key LIMIT ?",
+                (data_type, last_key, batch_size)
+            ).fetchall()
+            if not rows:
+                return old_bytes, new_bytes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for cache_key, payload, encoding in rows:
+                    new_payload, new_encoding = self.encode(data_type, self.decode(payload, encoding))
+                    old_bytes += len(payload)
+                    new_bytes += len(new_payload)
+                    conn.execute(
+                        "UPDATE cache_entries SET content = ?, encoding = ?, size = ? WHERE data_type = ? AND cache_key = ?",
+                        (new_payload, new_encoding, len(new_payload), data_type, cache_key)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            last_key = rows[-1][0]
+
+    def close(self):
+        """Close every thread's connection; threads reconnect on their next access"""
+        with self.lock:
+            self.generation += 1
+            for conn in self.connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self.connections = []
+
+    def get(self, data_type, cache_key):
+        """Return the entry as a dict shaped like the old JSON cache files, or None"""
+        conn = self.connect()
+        row = conn.execute(
+            "SELECT url, timestamp, content, encoding, etag, last_modified, last_access FROM cache_entries "
+            "WHERE data_type = ? AND cache_key = ?",
+            (data_type, cache_key)
+        ).fetchone()
+        if row is None:
+            return None
+        url, timestamp, content, encoding, etag, last_modified, last_access = row
+        now = time.time()
+        if now - last_access > CACHE_ACCESS_RESOLUTION:
+            # Coarse-grained so that reads rarely turn into writes
+            conn.execute("UPDATE cache_entries SET last_access = ? WHERE data_type = ? AND cache_key = ?",
+                         (now, data_type, cache_key))
+        text = self.decode_text(content, encoding)
+        cache_data = {
+            'url': url,
+            'timestamp': datetime.datetime.fromtimestamp(timestamp).isoformat(),
+            'content': json.loads(text),
+            'size': len(text),
+        }
+        if etag:
+            cache_data['etag'] = etag
+        if last_modified:
+            cache_data['last_modified'] = last_modified
+        return cache_data
+
+    def put(self, data_type, cache_key, url, content, timestamp=None, etag=None, last_modified=None,
+            content_hash=None):
+        payload, encoding = self.encode(data_type, content)
+        self.connect().execute(
+            "INSERT OR REPLACE INTO cache_entries "
+            "(data_type, cache_key, url, timestamp, content, encoding, etag, last_modified, last_access, size, "
+            "content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (data_type, cache_key, url, timestamp or time.time(), payload, encoding, etag, last_modified,
+             time.time(), len(payload), content_hash)
+        )
+
+    def touch(self, data_type, cache_key, etag=None, last_modified=None):
+        """Refresh an entry's timestamp (and validators, if given); returns True if it existed"""
+        now = time.time()
+        cursor = self.connect().execute(
+            "UPDATE cache_entries SET timestamp = ?, last_access = ?, etag = COALESCE(?, etag), "
+            "last_modified = COALESCE(?, last_modified) WHERE data_type = ? AND cache_key = ?",
+            (now, now, etag, last_modified, data_type, cache_key)
+        )
+        return cursor.rowcount > 0
+
+    def iter_entries(self, data_types):
+        """Yield every entry of the given data types as a portable dict (content decoded)"""
+        placeholders = ", ".join("?" * len(data_types))
+        # A separate connection so the long-running read doesn't hold this thread's one open
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            rows = conn.execute(
+                "SELECT data_type, cache_key, url, timestamp, content, encoding, etag, last_modified, content_hash "
+                f"FROM cache_entries WHERE data_type IN ({placeholders})", tuple(data_types)
+            )
+            for data_type, cache_key, url, timestamp, payload, encoding, etag, last_modified, content_hash in rows:
+                yield {
+                    "data_type": data_type,
+                    "cache_key": cache_key,
+                    "url": url,
+                    "timestamp": timestamp,
+                    "content": self.decode(payload, encoding),
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content_hash": content_hash,
+                }
+        finally:
+            conn.close()
+
+    def merge(self, entry):
+        """Store an exported entry unless we already hold one at least as new; returns True if stored"""
+        row = self.connect().execute(
+            "SELECT timestamp FROM cache_entries WHERE data_type = ? AND cache_key = ?",
+            (entry["data_type"], entry["cache_key"])
+        ).fetchone()
+        if row is not None and row[0] >= entry["timestamp"]:
+            return False
+        self.put(entry["data_type"], entry["cache_key"], entry["url"], entry["content"],
+                 timestamp=entry["timestamp"], etag=entry.get("etag"), last_modified=entry.get("last_modified"),
+                 content_hash=entry.get("content_hash"))
+        return True
+
+    # --- Retention ---
+
+    def collect_garbage(self, data_type, max_age_days=None, max_bytes=None, dry_run=False, batch_size=1000):
+        """Delete entries older than max_age_days, then evict least recently used entries
+        until the data_type fits in max_bytes. Returns (deleted_entries, freed_bytes)."""
+        conn = self.connect()
+        deleted = freed = 0
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            count, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE data_type = ? AND timestamp < ?",
+                (data_type, cutoff)
+            ).fetchone()
+            if not dry_run and count:
+                conn.execute("DELETE FROM cache_entries WHERE data_type = ? AND timestamp < ?", (data_type, cutoff))
+            deleted += count
+            freed += size
+        if max_bytes is not None:
+            total = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE data_type = ?", (data_type,)
+            ).fetchone()[0] - (freed if dry_run else 0)
+            offset = 0
+            while total > max_bytes:
+                rows = conn.execute(
+                    "SELECT cache_key, size FROM cache_entries WHERE data_type = ? "
+                    "ORDER BY last_access LIMIT ? OFFSET ?",
+                    (data_type, batch_size, offset)
+                ).fetchall()
+                if not rows:
+                    break
+                victims = []
+                for cache_key, size in rows:
+                    if total <= max_bytes:
+                        break
+                    victims.append(cache_key)
+                    total -= size
+                    freed += size
+                deleted += len(victims)
+                if dry_run:
+                    offset += len(rows)
+                else:
+                    conn.executemany("DELETE FROM cache_entries WHERE data_type = ? AND cache_key = ?",
+                                     [(data_type, cache_key) for cache_key in victims])
+        return deleted, freed
+
+    def collect_derived(self, data_type, version, dry_run=False):
+        """Delete derived entries made by another extractor version or from HTML no longer cached.
+
+        Derived keys are "<content hash>:<extractor version>"; entries from the URL-keyed
+        layout have no version suffix and are collected too. Returns (deleted_entries, freed_bytes).
+        """
+        where = ("data_type = ? AND (cache_key NOT LIKE ? OR substr(cache_key, 1, 64) NOT IN "
+                 "(SELECT content_hash FROM cache_entries WHERE data_type = 'html' AND content_hash IS NOT NULL))")
+        params = (data_type, f"%:{version}")
+        conn = self.connect()
+        deleted, freed = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE {where}",
+                                      params).fetchone()
+        if not dry_run and deleted:
+            conn.execute(f"DELETE FROM cache_entries WHERE {where}", params)
+        return deleted, freed
+
+    def release_space(self, full_vacuum=False):
+        """Hand freed pages back to the filesystem"""
+        conn = self.connect()
+        if full_vacuum:
+            conn.execute("VACUUM")
+        else:
+            conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def stats(self):
+        """Per data_type entry counts, sizes and ages"""
+        expiry_cutoff = time.time() - CACHE_EXPIRY_DAYS * 86400
+        return self.connect().execute(
+            "SELECT data_type, COUNT(*), COALESCE(SUM(size), 0), MIN(timestamp), MAX(timestamp), "
+            "SUM(timestamp < ?), GROUP_CONCAT(DISTINCT encoding) "
+            "FROM cache_entries GROUP BY data_type ORDER BY data_type",
+            (expiry_cutoff,)
+        ).fetchall()
+
+cache_stores = {}
+cache_stores_lock = threading.Lock()
+
+def get_cache_store():
+    """Get the CacheStore for the current CACHE_DIR"""
+    path = os.path.join(CACHE_DIR, CACHE_DB_NAME)
+    store = cache_stores.get(path)
+    if store is None:
+        with cache_stores_lock:
+            store = cache_stores.setdefault(path, CacheStore(path))
+    return store
+
+def close_cache_stores():
+    """Close all cache connections (e.g. before the cache directory is removed or swapped)"""
+    with cache_gc_lock:  # Let a background collection finish first
+        with cache_stores_lock:
+            for store in cache_stores.values():
+                store.close()
+            cache_stores.clear()
+    memory_cache.clear()
+
+# Decoded entries in front of the store, so repeated lookups within a run (discovery,
+# extraction, retries) skip the SQLite read and decompression
+memory_cache = LRUCache(MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_MB * 1048576)
+
+last_cache_gc = time.monotonic()
+cache_gc_lock = threading.Lock()  # Held while a background gc runs, so savers don't start another
+
+def collect_cache_garbage(data_types=None, max_age_days=None, max_mb=None, dry_run=False, vacuum=False):
+    """Apply CACHE_LIMITS (or the given overrides) to the cache; returns {data_type: (deleted, freed_bytes)}"""
+    store = get_cache_store()
+    results = {}
+    for data_type in data_types or CACHE_DATA_TYPES:
+        limits = CACHE_LIMITS.get(data_type, {})
+        age = max_age_days if max_age_days is not None else limits.get("max_age_days")
+        size_mb = max_mb if max_mb is not None else limits.get("max_mb")
+        max_bytes = int(size_mb * 1048576) if size_mb is not None else None
+        deleted, freed = store.collect_garbage(data_type, age, max_bytes, dry_run=dry_run)
+        if data_type in DERIVED_DATA_TYPES:
+            orphaned, orphaned_bytes = store.collect_derived(data_type, get_extractor_version(), dry_run=dry_run)
+            deleted, freed = deleted + orphaned, freed + orphaned_bytes
+        results[data_type] = (deleted, freed)
+    if not dry_run:
+        store.release_space(full_vacuum=vacuum)
+    return results
+
+def maybe_collect_cache_garbage():
+    """Start a garbage collection in the background every CACHE_GC_INTERVAL seconds during
+    long runs. Called from save_to_cache, which may be on the event loop, so the collection,
+    vacuum and checkpoint never run on the caller's thread."""
+    global last_cache_gc
+    if not CACHE_GC_INTERVAL or time.monotonic() - last_cache_gc < CACHE_GC_INTERVAL:
+        return
+    # Whoever gets the lock starts the collection; everyone else carries on saving
+    if not cache_gc_lock.acquire(blocking=False):
+        return
+    if time.monotonic() - last_cache_gc < CACHE_GC_INTERVAL:
+        cache_gc_lock.release()  # Another thread has just collected
+        return
+    last_cache_gc = time.monotonic()
+    threading.Thread(target=run_cache_gc, name="cache-gc", daemon=True).start()
+
+def run_cache_gc():
+    """Body of the background collection; releases cache_gc_lock when done"""
+    try:
+        results = collect_cache_garbage()
+        deleted = sum(count for count, _ in results.values())
+        freed = sum(size for _, size in results.values())
+        if deleted:
+            logging.info(f"Cache gc removed {deleted} entries ({freed / 1048576:.1f} MB)")
+    except Exception as e:
+        logging.warning(f"Cache garbage collection failed: {e}")
+    finally:
+        cache_gc_lock.release()
+
+def load_cache_entry(url, data_type="html", cache_key=None):
+    """Load the raw cache entry (content, timestamp and HTTP validators) regardless of age"""
+    key = (data_type, cache_key or get_cache_key(url))
+    cache_data = memory_cache.get(key)
+    if cache_data is not None:
+        return cache_data
+    try:
+        cache_data = get_cache_store().get(*key)
+    except Exception as e:
+        logging.warning(f"Error reading cache for {url}: {e}")
+        return None
+    if cache_data is not None:
+        memory_cache.put(key, cache_data, cache_data.get('size', 0))
+    return cache_data
+
+def is_cache_entry_expired(cache_data):
+    """Check whether a cache entry is older than CACHE_EXPIRY_DAYS"""
+    timestamp = datetime.datetime.fromisoformat(cache_data['timestamp'])
+    now = datetime.datetime.now()
+    return (now - timestamp).days > CACHE_EXPIRY_DAYS
+
+def get_from_cache(url, data_type="html", allow_expired=False):
     """Retrieve content from cache if it exists and is not expired"""
-    cache_path = get_cache_path(url, data_type)
-    
-    if not os.path.exists(cache_path):
+    cache_data = load_cache_entry(url, data_type)
+    if cache_data is None:
         return None
         
     try:
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
-            
         # Check if cache is expired
-        timestamp = datetime.datetime.fromisoformat(cache_data['timestamp'])
-        now = datetime.datetime.now()
-        if (now - timestamp).days > CACHE_EXPIRY_DAYS:
+        if not allow_expired and is_cache_entry_expired(cache_data):
             logging.debug(f"Cache expired for {url}")
             return None
             
@@ -191,52 +1260,411 @@ def get_from_cache(url, data_type="html"):
         logging.warning(f"Error reading cache for {url}: {e}")
         return None
 
-def save_to_cache(url, content, data_type="html"):
-    """Save content to cache with current timestamp"""
-    cache_path = get_cache_path(url, data_type)
-    
+def save_to_cache(url, content, data_type="html", validators=None, cache_key=None):
+    """Save content to cache with current timestamp and optional ETag/Last-Modified validators"""
+    validators = validators or {}
+    cache_key = cache_key or get_cache_key(url)
+    memory_cache.discard((data_type, cache_key))
     try:
-        cache_data = {
-            'url': url,
-            'timestamp': datetime.datetime.now().isoformat(),
-            'content': content
-        }
-        
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False)
-            
+        get_cache_store().put(data_type, cache_key, url, content,
+                              etag=validators.get('etag'), last_modified=validators.get('last_modified'),
+                              content_hash=get_content_hash(content) if data_type == "html" else None)
         logging.debug(f"Saved to cache: {url}")
     except Exception as e:
         logging.warning(f"Error saving to cache for {url}: {e}")
+    maybe_collect_cache_garbage()
+
+def get_content_hash(html):
+    """Content address of a page"""
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+extractor_version = None
+
+def get_extractor_version():
+    """EXTRACTOR_VERSION plus a fingerprint of the extraction code, so editing an extractor
+    invalidates everything it derived without a manual bump"""
+    global extractor_version
+    if extractor_version is None:
+        try:
+            source = "".join(inspect.getsource(func) for func in EXTRACTOR_FUNCTIONS)
+        except (OSError, TypeError):
+            source = ""  # No source available (e.g. frozen build); rely on EXTRACTOR_VERSION
+        # normalize_url resolves the route_urls in derived area records against these
+        source += repr((MP_ORIGIN, MP_HOSTS))
+        extractor_version = f"{EXTRACTOR_VERSION}.{hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]}"
+    return extractor_version
+
+class ParsedPage:
+    """Fetched page HTML whose tree is parsed on first use and then shared by every
+    extractor that reads the page (the tree is read-only once parsed)"""
+
+    def __init__(self, html, soup=None):
+        self.html = html
+        self.parsed = soup
+        self.lock = threading.Lock()
+
+    @property
+    def soup(self):
+        with self.lock:
+            if self.parsed is None:
+                self.parsed = BeautifulSoup(self.html, 'lxml')
+            return self.parsed
+
+def get_derived(page, url, data_type, extract):
+    """Return what extract(soup, url) derives from a ParsedPage, parsing the page only if
+    this exact content has not been through the current extractor version before.
+
+    The result is shared with the cache and must not be modified.
+    """
+    cache_key = f"{get_content_hash(page.html)}:{get_extractor_version()}"
+    cache_data = load_cache_entry(url, data_type, cache_key)
+    if cache_data is not None:
+        logging.debug(f"Derived {data_type} hit for {url}")
+        return cache_data['content']
+    derived = extract(page.soup, url)
+    save_to_cache(url, derived, data_type, cache_key=cache_key)
+    return derived
+
+def touch_cache(url, data_type="html", validators=None):
+    """Mark an existing cache entry as fresh again (e.g. after a 304 Not Modified)"""
+    validators = validators or {}
+    memory_cache.discard((data_type, get_cache_key(url)))
+    try:
+        return get_cache_store().touch(data_type, get_cache_key(url),
+                                       validators.get('etag'), validators.get('last_modified'))
+    except Exception as e:
+        logging.warning(f"Error refreshing cache for {url}: {e}")
+        return False
+
+class RevalidationQueue:
+    """Background refreshes for expired entries served under STALE_WHILE_REVALIDATE.
+
+    Each (data_type, url) is queued at most once at a time. Worker threads call the
+    normal fetch function for the entry; while they do, get_stale_content returns
+    None on that thread so the fetch really goes to the network.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.tasks = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.threads = []
+        self.refreshed = 0
+        self.failed = 0
+
+    def is_refreshing(self):
+        return getattr(self.local, "active", False)
+
+    def submit(self, key, refresh, *args, **kwargs):
+        with self.lock:
+            if key in self.pending:
+                return
+            self.pending.add(key)
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self.run, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        self.tasks.put((key, refresh, args, kwargs))
+
+    def run(self):
+        self.local.active = True
+        while True:
+            key, refresh, args, kwargs = self.tasks.get()
+            try:
+                refresh(*args, **kwargs)
+                with self.lock:
+                    self.refreshed += 1
+            except Exception as e:
+                logging.warning(f"Background refresh of {key[1]} ({key[0]}) failed: {e}")
+                with self.lock:
+                    self.failed += 1
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
+                self.tasks.task_done()
+
+    def drain(self):
+        """Block until every queued refresh has finished"""
+        with self.lock:
+            waiting = len(self.pending)
+        if waiting:
+            logging.info(f"Waiting for {waiting} background cache refreshes...")
+        self.tasks.join()
+
+    def summary(self):
+        with self.lock:
+            return f"{self.refreshed} refreshed, {self.failed} failed, {len(self.pending)} pending"
+
+revalidation_queue = RevalidationQueue(REVALIDATE_WORKERS)
+
+def get_stale_content(url, data_type, refresh, *args, **kwargs):
+    """Under STALE_WHILE_REVALIDATE, return the content of an expired entry and queue
+    refresh(*args, **kwargs) to bring it up to date; otherwise (or with no entry) None"""
+    if not STALE_WHILE_REVALIDATE or OFFLINE or revalidation_queue.is_refreshing():
+        return None
+    cache_data = load_cache_entry(url, data_type)
+    if cache_data is None:
+        return None
+    logging.debug(f"Serving stale {data_type} for {url}")
+    revalidation_queue.submit((data_type, url), refresh, *args, **kwargs)
+    return cache_data['content']
+
+def migrate_json_cache(cache_dir=None):
+    """Import entries from the old one-file-per-URL JSON cache into the SQLite store"""
+    cache_dir = cache_dir or CACHE_DIR
+    store = get_cache_store()
+    imported = 0
+    for data_type in CACHE_DATA_TYPES:
+        type_dir = os.path.join(cache_dir, data_type)
+        if data_type in DERIVED_DATA_TYPES or not os.path.isdir(type_dir):
+            # URL-keyed derived records are re-derived from the imported HTML instead
+            continue
+        for entry in os.scandir(type_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+                timestamp = datetime.datetime.fromisoformat(cache_data['timestamp']).timestamp()
+                existing = store.get(data_type, get_cache_key(cache_data['url']))
+                if existing and datetime.datetime.fromisoformat(existing['timestamp']).timestamp() >= timestamp:
+                    continue
+                store.put(data_type, get_cache_key(cache_data['url']), cache_data['url'], cache_data['content'],
+                          timestamp=timestamp, etag=cache_data.get('etag'),
+                          last_modified=cache_data.get('last_modified'),
+                          content_hash=get_content_hash(cache_data['content']) if data_type == "html" else None)
+                imported += 1
+            except Exception as e:
+                logging.warning(f"Skipping unreadable cache file {entry.path}: {e}")
+    return imported
+
+CACHE_ARCHIVE_FORMAT = "mtnpj-cache"
+CACHE_ARCHIVE_VERSION = 1
+
+def collect_root_pages(root_urls):
+    """Cache keys and page hashes of everything cached under the given area roots.
+
+    Walks the cached area tree (no network) and collects the areas, their routes,
+    the routes' stats pages and the comment endpoints of both. Returns
+    (cache_keys, content_hashes) where the hashes select the derived entries made
+    from those pages.
+    """
+    cache_keys, content_hashes = set(), set()
+    pending = [normalize_url(url) for url in root_urls]
+    while pending:
+        area_url = pending.pop()
+        cache_key = get_cache_key(area_url)
+        if cache_key in cache_keys:
+            continue
+        cache_keys.add(cache_key)
+        cache_keys.add(get_cache_key(get_comments_url(area_url) or area_url))
+        cache_data = load_cache_entry(area_url, "html")
+        if cache_data is None:
+            continue
+        content_hashes.add(get_content_hash(cache_data['content']))
+        soup = BeautifulSoup(cache_data['content'], 'lxml')
+        pending.extend(normalize_url(link['href'], area_url) for link in get_sub_area_links(soup))
+        for route_link in extract_route_links(soup, area_url):
+            route_url = route_link["route_url"]
+            cache_keys.update((get_cache_key(route_url), get_cache_key(get_stats_url(route_url)),
+                               get_cache_key(get_comments_url(route_url) or route_url)))
+            route_data = load_cache_entry(route_url, "html")
+            if route_data is not None:
+                content_hashes.add(get_content_hash(route_data['content']))
+    return cache_keys, content_hashes
+
+def export_cache(path, data_types=None, roots=None):
+    """Write cache entries to a gzip JSON-lines archive; returns the number exported.
+
+    The first line describes the archive and the last carries the entry count and a
+    sha256 of every line before it, so import_cache can reject truncated or corrupt files.
+    Content is stored decoded, since zstd dictionaries are local to each cache.
+    """
+    data_types = list(data_types or CACHE_DATA_TYPES)
+    selected_keys, selected_hashes = collect_root_pages(roots) if roots else (None, None)
+    digest = hashlib.sha256()
+    count = 0
+    
+    def write_line(f, record):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        digest.update(line)
+        f.write(line)
+    
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with gzip.open(path, "wb") as f:
+        write_line(f, {"format": CACHE_ARCHIVE_FORMAT, "version": CACHE_ARCHIVE_VERSION,
+                       "created": datetime.datetime.now().isoformat(), "data_types": data_types, "roots": roots})
+        for entry in get_cache_store().iter_entries(data_types):
+            if selected_keys is not None:
+                if entry["data_type"] in DERIVED_DATA_TYPES:
+                    if entry["cache_key"].split(":", 1)[0] not in selected_hashes:
+                        continue
+                elif entry["cache_key"] not in selected_keys:
+                    continue
+            write_line(f, entry)
+            count += 1
+        f.write((json.dumps({"entries": count, "sha256": digest.hexdigest()}) + "\n").encode("utf-8"))
+    return count
+
+def import_cache(path):
+    """Merge an export_cache archive into the cache, keeping the newer copy of each entry.
+
+    Runs in one transaction that is rolled back if the checksum doesn't match.
+    Returns (entries_read, entries_stored).
+    """
+    store = get_cache_store()
+    conn = store.connect()
+    digest = hashlib.sha256()
+    read = stored = 0
+    trailer = None
+    with gzip.open(path, "rb") as f:
+        header_line = f.readline()
+        header = json.loads(header_line)
+        if header.get("format") != CACHE_ARCHIVE_FORMAT or header.get("version") != CACHE_ARCHIVE_VERSION:
+            raise ValueError(f"{path} is not a version {CACHE_ARCHIVE_VERSION} cache archive")
+        digest.update(header_line)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for line in f:
+                record = json.loads(line)
+                if "data_type" not in record:
+                    trailer = record
+                    break
+                digest.update(line)
+                read += 1
+                if record["data_type"] not in DERIVED_DATA_TYPES:
+                    # Keys follow this cache's get_cache_key, whatever the exporting host used
+                    record["cache_key"] = get_cache_key(record["url"])
+                if store.merge(record):
+                    stored += 1
+            if trailer is None or trailer.get("entries") != read or trailer.get("sha256") != digest.hexdigest():
+                raise ValueError(f"{path} is truncated or corrupt (checksum mismatch)")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    memory_cache.clear()
+    return read, stored
+
+def get_response_validators(headers):
+    """Extract the HTTP validators we store alongside cached pages"""
+    validators = {}
+    if headers.get('ETag'):
+        validators['etag'] = headers['ETag']
+    if headers.get('Last-Modified'):
+        validators['last_modified'] = headers['Last-Modified']
+    return validators
+
+def get_conditional_headers(cache_data):
+    """Build If-None-Match / If-Modified-Since headers from a cached entry"""
+    headers = {}
+    if cache_data and cache_data.get('etag'):
+        headers['If-None-Match'] = cache_data['etag']
+    if cache_data and cache_data.get('last_modified'):
+        headers['If-Modified-Since'] = cache_data['last_modified']
+    return headers
 
 # ==================== Helper Functions ====================
 
+def sanitize_html(html):
+    """Reduce a page to what the extractors read before it is cached.
+
+    Drops SANITIZE_DROP_TAGS and comments, strips attributes outside
+    SANITIZE_KEEP_ATTRIBUTES and collapses whitespace-only text, which
+    typically shrinks Mountain Project pages several times over and makes
+    every later parse proportionally cheaper. Returns the page unchanged if
+    it can't be parsed or KEEP_FULL_HTML is set.
+    """
+    if KEEP_FULL_HTML or not html:
+        return html
+    try:
+        # Parse bytes: lxml refuses str input that carries an XML encoding declaration
+        parser = etree.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+        tree = etree.fromstring(html.encode('utf-8'), parser)
+        if tree is None:
+            return html
+        etree.strip_elements(tree, *SANITIZE_DROP_TAGS, with_tail=False)
+        for element in tree.iter():
+            for name in element.attrib.keys():
+                if name not in SANITIZE_KEEP_ATTRIBUTES:
+                    del element.attrib[name]
+            if element.text and not element.text.strip():
+                element.text = " "
+            if element.tail and not element.tail.strip():
+                element.tail = " "
+        return etree.tostring(tree, encoding='unicode', method='html')
+    except (etree.LxmlError, ValueError) as e:
+        logging.debug(f"Could not sanitize page, caching it as is: {e}")
+        return html
+
+class OfflineCacheMiss(requests.RequestException):
+    """Raised in OFFLINE mode for a page that is not in the cache"""
+
+def fetch_page(url, allow_streaming=True):
+    """Get page HTML from the cache or through the fetch layer (raises on HTTP errors).
+
+    Expired entries that carry an ETag/Last-Modified are revalidated with a
+    conditional request. Returns (html, not_modified) where not_modified is True
+    when the server answered 304 and the cached copy was reused. Pass
+    allow_streaming=False for pages whose content lies past STREAM_STOP_MARKERS.
+    """
+    cache_data = load_cache_entry(url, "html")
+    if cache_data and (OFFLINE or not is_cache_entry_expired(cache_data)):
+        logging.debug(f"Cache hit for {url}")
+        return cache_data['content'], False
+    if OFFLINE:
+        raise OfflineCacheMiss(f"{url} is not in the cache")
+    stale_html = get_stale_content(url, "html", fetch_page, url, allow_streaming=allow_streaming) if cache_data else None
+    if stale_html is not None:
+        return stale_html, False
+    
+    streaming = STREAMING_PARSE and allow_streaming
+    conditional_headers = get_conditional_headers(cache_data)
+    logging.debug(f"Fetching {url}{' (conditional)' if conditional_headers else ''}")
+    response = rate_limited_request(url, headers=conditional_headers, stream=streaming)
+    
+    if response.status_code == 304 and cache_data:
+        logging.debug(f"Not modified: {url}")
+        response.close()
+        touch_cache(url, "html", get_response_validators(response.headers))
+        return cache_data['content'], True
+    
+    if streaming and response.ok:
+        html = read_streaming_html(response, url)
+    else:
+        response.raise_for_status()
+        html = response.text
+    
+    record_fixture(url, response.status_code, response.headers, html)
+    
+    # Save to cache
+    html = sanitize_html(html)
+    save_to_cache(url, html, "html", get_response_validators(response.headers))
+    
+    return html, False
+
+def fetch_html(url):
+    """Get page HTML from the cache or through the fetch layer (raises on HTTP errors)"""
+    return fetch_page(url)[0]
+
 def get_soup(url):
     """Get BeautifulSoup object from URL with caching"""
-    # Check cache first
-    cached_html = get_from_cache(url, "html")
-    if cached_html:
-        return BeautifulSoup(cached_html, 'lxml')  # Using lxml parser for better performance
-    
     try:
-        logging.debug(f"Fetching {url}")
-        # Use rate limited request with random user agent
-        response = rate_limited_request(url)
-        response.raise_for_status()
-        
-        # Save to cache
-        save_to_cache(url, response.text, "html")
-        
-        return BeautifulSoup(response.text, 'lxml')
+        return BeautifulSoup(fetch_html(url), 'lxml')  # Using lxml parser for better performance
     except requests.RequestException as e:
         logging.error(f"Request error: {e}")
         return None
 
+# Parsed leaf-area pages shared between discovery and extraction. Discovery already fetches
+# and parses every leaf area page; keeping the tree here lets get_routes pop it instead of
+# loading and parsing the same page again (evicted pages are still in the disk cache).
+page_store = LRUCache(PAGE_STORE_MAX_PAGES)
+
 def create_memory_efficient_soup(html):
     """Create a memory-efficient BeautifulSoup object for very large HTML content"""
     # Use the lxml parser for better memory efficiency and speed
-    from lxml import etree
-    
     try:
         # First pass: Parse with lxml's HTML parser
         parser = etree.HTMLParser()
@@ -328,18 +1756,73 @@ def get_access_issues(soup):
     issues = [div.get_text(separator=" ", strip=True) for div in issue_divs if div.get_text(strip=True)]
     return " ".join(issues) if issues else ""
 
-def scrape_lowest_level_areas(start_url):
-    """Find all lowest-level areas using iteration instead of recursion"""
-    to_visit = [(start_url, [])]  # Stack of (url, hierarchy) pairs
+CRAWL_ORDERS = ("dfs", "depth", "page-views")
+
+class CrawlFrontier:
+    """Priority frontier for area discovery with round-robin fairness across roots.
+
+    Every root gets its own heap and pop() rotates between the roots that still
+    have work, so crawling several states together interleaves them instead of
+    finishing one before starting the next. Within a root the crawl order
+    decides which page comes next:
+      dfs        - last discovered link first (the old stack behaviour)
+      depth      - shallowest areas first
+      page-views - children of the most viewed areas first
+    """
+
+    def __init__(self, order="dfs"):
+        if order not in CRAWL_ORDERS:
+            raise ValueError(f"Unknown crawl order: {order}")
+        self.order = order
+        self.queues = OrderedDict()  # root -> heap of (priority, url, hierarchy)
+        self.counter = itertools.count()
+
+    def priority(self, depth, page_views):
+        seq = next(self.counter)
+        if self.order == "depth":
+            return (depth, seq)
+        if self.order == "page-views":
+            return (-page_views, depth, seq)
+        return (-seq,)
+
+    def push(self, url, hierarchy, root, page_views=0):
+        heap = self.queues.setdefault(root, [])
+        heapq.heappush(heap, (self.priority(len(hierarchy), page_views), url, hierarchy))
+
+    def pop(self):
+        """Return (url, hierarchy, root) from the next root in rotation"""
+        root, heap = next(iter(self.queues.items()))
+        _, url, hierarchy = heapq.heappop(heap)
+        # Rotate this root to the back; drop it once it has no more work
+        del self.queues[root]
+        if heap:
+            self.queues[root] = heap
+        return url, hierarchy, root
+
+    def __len__(self):
+        return sum(len(heap) for heap in self.queues.values())
+
+def parse_page_views(soup):
+    """Page views of an area page as an int (0 if unknown)"""
+    page_views, _ = get_area_page_info(soup)
+    return int(page_views) if page_views.isdigit() else 0
+
+def scrape_lowest_level_areas(start_url, order=None):
+    """Find all lowest-level areas under one or more roots, visiting pages by priority"""
+    start_urls = [start_url] if isinstance(start_url, str) else list(start_url)
+    frontier = CrawlFrontier(order or CRAWL_ORDER)
+    for root in start_urls:
+        frontier.push(root, [], root)
     lowest_level_urls = []
     visited = set()
 
-    while to_visit:
-        url, hierarchy = to_visit.pop()
-        if url in visited:
+    while frontier:
+        url, hierarchy, root = frontier.pop()
+        page = canonicalize_url(url)
+        if page in visited:
             continue
             
-        visited.add(url)
+        visited.add(page)
         logging.info(f"Visiting {url}")
         
         soup = get_soup(url)
@@ -352,12 +1835,14 @@ def scrape_lowest_level_areas(start_url):
         
         if is_lowest_level_area(soup, sub_area_links):
             lowest_level_urls.append(url)
+            page_store.put(url, soup)
         else:
+            page_views = parse_page_views(soup) if frontier.order == "page-views" else 0
             for link in sub_area_links:
                 if '/area/' in link['href']:
-                    sub_area_url = link['href'] if link['href'].startswith('http') else BASE_URL + link['href']
-                    if sub_area_url not in visited:
-                        to_visit.append((sub_area_url, current_hierarchy))
+                    sub_area_url = normalize_url(link['href'], url)
+                    if canonicalize_url(sub_area_url) not in visited:
+                        frontier.push(sub_area_url, current_hierarchy, root, page_views)
     
     return lowest_level_urls
 
@@ -376,6 +1861,7 @@ def scrape_lowest_level_areas_parallel(start_url, max_workers=None):
     if not sub_area_links:
         # This might be a lowest-level area itself
         if is_lowest_level_area(soup, []):
+            page_store.put(start_url, soup)
             return [start_url]
         return []
     
@@ -383,8 +1869,7 @@ def scrape_lowest_level_areas_parallel(start_url, max_workers=None):
     sub_area_urls = []
     for link in sub_area_links:
         if '/area/' in link['href']:
-            sub_url = link['href'] if link['href'].startswith('http') else BASE_URL + link['href']
-            sub_area_urls.append(sub_url)
+            sub_area_urls.append(normalize_url(link['href'], start_url))
     
     logging.info(f"Found {len(sub_area_urls)} immediate sub-areas to process in parallel")
     
@@ -401,10 +1886,11 @@ def scrape_lowest_level_areas_parallel(start_url, max_workers=None):
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Define a function to process a single URL
             def process_sub_area(url):
-                if url in visited:
+                page = canonicalize_url(url)
+                if page in visited:
                     return [], []
                 
-                visited.add(url)
+                visited.add(page)
                 logging.debug(f"Visiting {url}")
                 
                 soup = get_soup(url)
@@ -415,20 +1901,22 @@ def scrape_lowest_level_areas_parallel(start_url, max_workers=None):
                 
                 # If it's a lowest-level area, add it to our results
                 if is_lowest_level_area(soup, sub_links):
+                    page_store.put(url, soup)
                     return [url], []
                 
                 # Otherwise, return its sub-areas for the next wave
                 next_urls = []
                 for link in sub_links:
                     if '/area/' in link['href']:
-                        next_url = link['href'] if link['href'].startswith('http') else BASE_URL + link['href']
-                        if next_url not in visited:
+                        next_url = normalize_url(link['href'], url)
+                        if canonicalize_url(next_url) not in visited:
                             next_urls.append(next_url)
                 
                 return [], next_urls
             
             # Submit all URLs in the current wave
-            future_to_url = {executor.submit(process_sub_area, url): url for url in current_wave if url not in visited}
+            future_to_url = {executor.submit(process_sub_area, url): url for url in current_wave
+                             if canonicalize_url(url) not in visited}
             
             # Process results as they complete
             with tqdm.tqdm(total=len(future_to_url), desc="Discovering areas") as pbar:
@@ -446,30 +1934,233 @@ def scrape_lowest_level_areas_parallel(start_url, max_workers=None):
 
 # ==================== Selenium Driver Management ====================
 
-def get_driver():
-    """Get or create a Selenium WebDriver instance"""
-    global global_driver
-    
-    if global_driver is not None:
+class PooledDriver:
+    """A browser checked out of the DriverPool, with its usage counters"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.last_used = time.monotonic()
+        self.rss = 0  # Bytes, as of the last memory check
+
+def get_driver_rss(driver):
+    """Resident memory in bytes of chromedriver and every process under it (Chrome, its
+    renderers and helpers); None without psutil or when the process is gone"""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if psutil is None or process is None:
+        return None
+    try:
+        root = psutil.Process(process.pid)
+        total = root.memory_info().rss
+        for child in root.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass  # Exited while we were looking
+        return total
+    except psutil.Error:
+        return None
+
+class DriverPool:
+    """Up to `size` headless browsers shared by the worker threads.
+
+    Each browser is used by one thread at a time: borrow() checks one out,
+    launching it lazily while the pool is below size and otherwise waiting for
+    one to come back. A browser whose chromedriver has exited, or which was idle
+    for DRIVER_HEALTH_CHECK_IDLE seconds and doesn't answer a script, is replaced.
+    On return a browser is restarted once it has loaded max_pages pages or its
+    process tree has grown past max_rss_mb, before it slows down or takes the host
+    into swap. After Chrome fails to start, borrow() yields None for
+    DRIVER_LAUNCH_BACKOFF seconds. A size of None follows SELENIUM_POOL_SIZE, or
+    MAX_WORKERS when that isn't set, at the time a browser is needed.
+    """
+
+    def __init__(self, size=None, max_pages=DRIVER_MAX_PAGES, max_rss_mb=DRIVER_MAX_RSS_MB, factory=None):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.factory = factory  # Defaults to init_selenium_driver
+        self.idle = []  # Most recently returned last, so a warm browser is reused first
+        self.count = 0  # Live browsers, including ones being launched
+        self.condition = threading.Condition()
+        self.launch_failed_at = None
+        self.launched = 0
+        self.recycled = 0
+        self.recycled_for_memory = 0
+        self.replaced = 0
+        self.pages_loaded = 0  # Across every browser, for rates alongside fetch_stats
+        self.peak_rss = 0
+
+    def get_size(self):
+        return self.size or SELENIUM_POOL_SIZE or MAX_WORKERS
+
+    def checkout(self):
+        """Take a healthy browser from the pool; None if Chrome can't be started or USE_SELENIUM is off"""
+        if not USE_SELENIUM:
+            return None
+        while True:
+            with self.condition:
+                while not self.idle and self.count >= max(self.get_size(), 1):
+                    self.condition.wait()
+                if self.idle:
+                    pooled = self.idle.pop()
+                elif (self.launch_failed_at is not None
+                      and time.monotonic() - self.launch_failed_at < DRIVER_LAUNCH_BACKOFF):
+                    return None
+                else:
+                    self.count += 1
+                    pooled = None
+            if pooled is None:
+                return self.launch()
+            if self.is_healthy(pooled):
+                return pooled
+            logging.info("Browser stopped responding; replacing it")
+            self.discard(pooled)
+            with self.condition:
+                self.replaced += 1
+
+    def launch(self):
+        driver = (self.factory or init_selenium_driver)()
+        with self.condition:
+            if driver is None:
+                self.count -= 1
+                self.launch_failed_at = time.monotonic()
+                self.condition.notify()
+                return None
+            self.launch_failed_at = None
+            self.launched += 1
+        return PooledDriver(driver)
+
+    def is_healthy(self, pooled, probe=False):
+        """Cheap liveness check; also asks the browser to run a script when probe is set
+        or the browser has been idle long enough to have crashed unnoticed"""
+        process = getattr(getattr(pooled.driver, "service", None), "process", None)
+        if process is not None and process.poll() is not None:
+            return False  # chromedriver has exited
+        if not probe and time.monotonic() - pooled.last_used < DRIVER_HEALTH_CHECK_IDLE:
+            return True
         try:
-            # Test if driver is still working
-            global_driver.current_url
-            logging.debug("Reusing existing WebDriver")
-            return global_driver
+            return pooled.driver.execute_script("return 1") == 1
         except Exception:
-            logging.debug("Existing WebDriver not responsive, creating new one")
-            if global_driver:
-                try:
-                    global_driver.quit()
-                except:
-                    pass
-            global_driver = None
-    
-    global_driver = init_selenium_driver()
-    return global_driver
+            return False
+
+    def checkin(self, pooled, healthy=True):
+        """Return a browser after one page, restarting it if it is broken or worn out"""
+        pooled.pages += 1
+        pooled.last_used = time.monotonic()
+        with self.condition:
+            self.pages_loaded += 1
+        over_memory = healthy and self.check_memory(pooled)
+        if not healthy:
+            logging.info("Replacing a browser that failed mid-page")
+            counter = "replaced"
+        elif over_memory:
+            logging.info(f"Recycling a browser using {pooled.rss / 1048576:.0f} MB "
+                         f"(limit {self.max_rss_mb} MB) after {pooled.pages} pages")
+            counter = "recycled_for_memory"
+        elif self.max_pages and pooled.pages >= self.max_pages:
+            memory = f" ({pooled.rss / 1048576:.0f} MB)" if pooled.rss else ""
+            logging.info(f"Recycling a browser after {pooled.pages} pages{memory}")
+            counter = "recycled"
+        else:
+            with self.condition:
+                self.idle.append(pooled)
+                self.condition.notify()
+            return
+        self.discard(pooled)
+        with self.condition:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def check_memory(self, pooled):
+        """Measure a browser's process tree; True if it is over max_rss_mb"""
+        rss = get_driver_rss(pooled.driver)
+        if rss is None:
+            return False
+        pooled.rss = rss
+        with self.condition:
+            self.peak_rss = max(self.peak_rss, rss)
+        return bool(self.max_rss_mb) and rss > self.max_rss_mb * 1048576
+
+    def discard(self, pooled):
+        """Quit a browser and free its slot (the next checkout launches a fresh one)"""
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        with self.condition:
+            self.count -= 1
+            self.condition.notify()
+
+    @contextmanager
+    def borrow(self):
+        """Context manager yielding a WebDriver (or None) that is returned to the pool on exit"""
+        pooled = self.checkout()
+        if pooled is None:
+            yield None
+            return
+        healthy = True
+        try:
+            yield pooled.driver
+        except Exception:
+            # A page error may just be the page; only drop the browser if it no longer answers
+            healthy = self.is_healthy(pooled, probe=True)
+            raise
+        finally:
+            self.checkin(pooled, healthy)
+
+    def close(self):
+        """Quit every idle browser (call once no thread is using the pool)"""
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.launch_failed_at = None
+        for pooled in idle:
+            self.discard(pooled)
+
+    def summary(self):
+        with self.condition:
+            summary = (f"{self.pages_loaded} pages, {self.launched} launched, {self.recycled} recycled after {self.max_pages} pages, "
+                       f"{self.recycled_for_memory} recycled for memory, {self.replaced} replaced, "
+                       f"{self.count} running")
+            if self.peak_rss:
+                summary += f", peak {self.peak_rss / 1048576:.0f} MB per browser"
+            return summary
+
+# Unsized, so scripts importing this module (fast_scrape.py) get a browser per worker too
+driver_pool = DriverPool()
+
+def apply_browser_profile(chrome_options, profile):
+    """Configure Chrome options for a BROWSER_PROFILES entry"""
+    if profile != "lean":
+        return
+    # Images are dropped by content type here; fonts and scripts by URL once the driver is up
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--mute-audio")
+    # driver.get returns at DOMContentLoaded; the explicit waits cover whatever renders later
+    chrome_options.page_load_strategy = "eager"
+
+def block_resources(driver, profile):
+    """Block BLOCKED_URL_PATTERNS in a running browser under the lean profile"""
+    if profile != "lean":
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URL_PATTERNS)})
+    except Exception as e:
+        logging.warning(f"Could not block resources in the browser: {e}")
+
+def page_loaded(driver):
+    """Whether the document has loaded as far as the browser profile waits for"""
+    state = driver.execute_script("return document.readyState")
+    if BROWSER_PROFILE == "lean":
+        return state in ("interactive", "complete")
+    return state == "complete"
 
 def init_selenium_driver():
     """Initialize Selenium driver"""
+    profile = BROWSER_PROFILE
     try:
         chrome_options = Options()
         chrome_options.add_argument("--headless=new")  # Updated headless argument
@@ -477,6 +2168,7 @@ def init_selenium_driver():
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--window-size=1920,1080")
+        apply_browser_profile(chrome_options, profile)
         
         # Detect Chrome binary location based on platform
         if sys.platform == "darwin":  # macOS
@@ -490,106 +2182,275 @@ def init_selenium_driver():
         try:
             service = Service()
             driver = webdriver.Chrome(service=service, options=chrome_options)
-            logging.debug("Successfully initialized Chrome driver")
-            return driver
+            logging.debug(f"Successfully initialized Chrome driver ({profile} profile)")
         except Exception as e:
             logging.error(f"Error creating Chrome driver: {e}")
             # Fallback to local ChromeDriver
             try:
                 service = Service(executable_path="/usr/local/bin/chromedriver")
                 driver = webdriver.Chrome(service=service, options=chrome_options)
-                logging.debug("Successfully initialized Chrome driver with local ChromeDriver")
-                return driver
+                logging.debug(f"Successfully initialized Chrome driver with local ChromeDriver ({profile} profile)")
             except Exception as e2:
                 logging.error(f"Error creating Chrome driver with local ChromeDriver: {e2}")
                 return None
+        block_resources(driver, profile)
+        # Otherwise driver.get may block for Selenium's default of 300s
+        driver.set_page_load_timeout(SELENIUM_WAIT_TIMEOUT)
+        return driver
                 
     except Exception as e:
         logging.error(f"Error initializing driver: {e}")
         return None
 
 def cleanup_driver():
-    """Clean up the global driver when done"""
-    global global_driver
-    if global_driver:
-        try:
-            global_driver.quit()
-        except:
-            pass
-        global_driver = None
+    """Quit the pooled browsers when done"""
+    driver_pool.close()
 
 # ==================== Selenium Dynamic Content Scrapers ====================
 
-def get_comments(page_url, user_email=None, user_pass=None, cookie_file="cookies.json"):
-    """Get comments using Selenium with caching"""
+class SourceCounter:
+    """Thread-safe tally of where comments and stats came from (HTTP or browser fallback)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def add(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def summary(self):
+        with self.lock:
+            return ", ".join(f"{key} {count}" for key, count in sorted(self.counts.items())) or "none fetched"
+
+source_counter = SourceCounter()
+
+def get_comments_url(page_url):
+    """URL of the comments endpoint for a route or area page, or None for other pages"""
+    kind, page_id = canonicalize_url(page_url)
+    model = COMMENT_MODELS.get(kind.rsplit('/', 1)[-1])
+    if model is None:
+        return None
+    parts = urlsplit(normalize_url(page_url))
+    return f"{parts.scheme}://{parts.netloc}" + COMMENTS_ENDPOINT.format(model=model, page_id=page_id)
+
+def fetch_server_rendered(url, marker=None):
+    """Parse a page fetched over plain HTTP (cached like any other page); None if the request
+    fails or the page lacks marker, i.e. the browser is needed after all"""
+    try:
+        html, _ = fetch_page(url, allow_streaming=False)
+    except (requests.RequestException, PermissionError) as e:
+        logging.debug(f"HTTP fetch of {url} failed: {e}")
+        return None
+    if marker and marker not in html:
+        logging.debug(f"{url} has no {marker}; falling back to the browser")
+        return None
+    return BeautifulSoup(html, "lxml")
+
+def get_comments_over_http(page_url):
+    """Comments from the endpoint the page's own script calls; None if unavailable"""
+    comments_url = get_comments_url(page_url)
+    if comments_url is None:
+        return None
+    soup = fetch_server_rendered(comments_url, marker="comment-list")
+    return parse_comments(soup) if soup is not None else None
+
+def is_stats_page(soup):
+    """Whether a parsed page carries the stats sections parse_stats reads"""
+    return any(h3.get_text(strip=True).startswith(STATS_PAGE_HEADINGS) for h3 in soup.find_all("h3"))
+
+def get_route_stats_over_http(route_url):
+    """Stats parsed from the server-rendered stats page; None if unavailable"""
+    stats_url = get_stats_url(route_url)
+    soup = fetch_server_rendered(stats_url)
+    if soup is None:
+        return None
+    if not is_stats_page(soup):
+        logging.debug(f"{stats_url} has no stats sections; falling back to the browser")
+        return None
+    return parse_stats(soup)
+
+COMMENT_SELECTOR = "div.comment-list table.main-comment"
+SHOW_MORE_SELECTOR = "button.show-more-comments-trigger"
+
+class CommentsSettled:
+    """WebDriverWait condition: the page has loaded and the number of comments has
+    stopped changing. A page whose comment list hasn't appeared COMMENTS_ABSENT_GRACE
+    seconds after loading is treated as having no comments."""
+
+    def __init__(self, min_count=0):
+        self.min_count = min_count
+        self.loaded_at = None
+        self.last_count = None
+        self.stable_since = None
+
+    def __call__(self, driver):
+        now = time.monotonic()
+        if self.loaded_at is None:
+            if not page_loaded(driver):
+                return False
+            self.loaded_at = now
+        count = len(driver.find_elements(By.CSS_SELECTOR, COMMENT_SELECTOR))
+        if count != self.last_count:
+            self.last_count, self.stable_since = count, now
+            return False
+        if now - self.stable_since < COMMENTS_STABLE_SECONDS:
+            return False
+        if count > self.min_count:
+            return True
+        # Nothing new yet: wait out the grace period in case the list is still loading
+        return now - self.loaded_at >= COMMENTS_ABSENT_GRACE
+
+def load_page(driver, url):
+    """Navigate to url and return the deadline shared by every wait on the page.
+
+    driver.get is bounded by the page-load timeout set in init_selenium_driver; a
+    page that hits it is used as far as it has loaded.
+    """
+    deadline = time.monotonic() + SELENIUM_WAIT_TIMEOUT
+    try:
+        driver.get(url)
+    except TimeoutException:
+        logging.debug(f"{url} still loading after {SELENIUM_WAIT_TIMEOUT}s; using what has loaded")
+    return deadline
+
+def wait_until(driver, condition, deadline):
+    """WebDriverWait for condition with whatever is left of the page's deadline; False on timeout"""
+    remaining = max(0.0, deadline - time.monotonic())
+    try:
+        WebDriverWait(driver, remaining, poll_frequency=SELENIUM_POLL_INTERVAL).until(condition)
+        return True
+    except TimeoutException:
+        return False
+
+def wait_for_comments(driver, deadline, min_count=0):
+    """Block until the comment list is present and stable (or the deadline passes); returns the count"""
+    condition = CommentsSettled(min_count)
+    if not wait_until(driver, condition, deadline):
+        logging.debug("Comments still changing at the page deadline; using what has loaded")
+    return condition.last_count or 0
+
+def expand_all_comments(driver, deadline):
+    """Click "show more comments" until it is gone or the deadline passes, waiting for each batch to load"""
+    count = wait_for_comments(driver, deadline)
+    for _ in range(MAX_SHOW_MORE_CLICKS):
+        if time.monotonic() >= deadline:
+            break
+        buttons = [button for button in driver.find_elements(By.CSS_SELECTOR, SHOW_MORE_SELECTOR) if button.is_displayed()]
+        if not buttons:
+            break
+        # A script click isn't swallowed by overlays the way a synthetic mouse click can be
+        driver.execute_script("arguments[0].click();", buttons[0])
+        new_count = wait_for_comments(driver, deadline, min_count=count)
+        if new_count <= count:
+            break  # The button did nothing; don't spin on it
+        count = new_count
+    return count
+
+def get_comments_from_page(page):
+    """Comments already in a fetched ParsedPage, or None unless it carries the complete list
+    (the list is usually loaded by script, and a streamed page is cut off where it starts)"""
+    if "main-comment" not in page.html:
+        return None  # Not worth parsing the page to find nothing
+    soup = page.soup
+    if soup.select_one(SHOW_MORE_SELECTOR) or not soup.select(COMMENT_SELECTOR):
+        return None
+    return parse_comments(soup)
+
+def get_comments(page_url, user_email=None, user_pass=None, cookie_file="cookies.json", page=None, try_http=True):
+    """Get comments from the already fetched page, over HTTP, or with Selenium if those fail, with caching.
+    Pass try_http=False when the comments endpoint has already failed (see async_get_comments)."""
+    if OFFLINE:
+        # Re-parse the cached page so parser fixes apply; fall back to the parsed copy
+        comments = get_comments_from_page(page) if page is not None else None
+        if comments is None and HTTP_FIRST:
+            comments = get_comments_over_http(page_url)
+        if comments is not None:
+            return comments
+        rendered = load_cache_entry(page_url, "rendered")
+        if rendered:
+            return parse_comments(BeautifulSoup(rendered['content'], "lxml"))
+        return get_from_cache(page_url, "comments", allow_expired=True) or []
+    
     # Check cache first
-    cache_key = f"comments_{get_cache_key(page_url)}"
     cached_comments = get_from_cache(page_url, "comments")
-    if cached_comments:
+    if cached_comments is not None:  # An empty list is a valid answer: the page has no comments
         return cached_comments
+    stale_comments = get_stale_content(page_url, "comments", get_comments, page_url,
+                                       user_email=user_email, user_pass=user_pass, cookie_file=cookie_file)
+    if stale_comments is not None:
+        return stale_comments
+    
+    comments = get_comments_from_page(page) if page is not None else None
+    if comments is not None:
+        source_counter.add("comments:page")
+        save_to_cache(page_url, comments, "comments")
+        return comments
+    
+    comments = get_comments_over_http(page_url) if HTTP_FIRST and try_http else None
+    if comments is not None:
+        source_counter.add("comments:http")
+        save_to_cache(page_url, comments, "comments")
+        return comments
+    if USE_SELENIUM:
+        source_counter.add("comments:browser")
     
     try:
-        driver = get_driver()
-        if not driver:
-            return []
+        # Each worker thread gets a browser of its own for the duration of the page
+        with driver_pool.borrow() as driver:
+            if not driver:
+                return []
             
-        try:
             logging.debug(f"Fetching comments from {page_url}")
-            driver.get(page_url)
-            time.sleep(3)  # Wait for page load
+            rate_limiter.acquire()
+            deadline = load_page(driver, page_url)
+            # Comments are loaded lazily once scrolled into view
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
-            
-            # Try to find and click "show more comments" button
-            try:
-                load_more = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "button.show-more-comments-trigger"))
-                )
-                load_more.click()
-                time.sleep(2)
-            except:
-                pass  # No "show more" button or already showing all comments
+            expand_all_comments(driver, deadline)
             
             # Parse comments from the page source
-            soup = BeautifulSoup(driver.page_source, "lxml")
-            comments = []
-            comment_list = soup.find("div", class_="comment-list")
-            
-            if comment_list:
-                comment_elements = comment_list.find_all("table", class_="main-comment")
-                for element in comment_elements:
-                    bio_div = element.find("div", class_="bio")
-                    comment_author = "N/A"
-                    if bio_div:
-                        a_tag = bio_div.find("a", href=re.compile(r"/user/"))
-                        if a_tag:
-                            comment_author = a_tag.text.strip()
-                    
-                    comment_body = element.find("div", class_="comment-body")
-                    comment_text = comment_body.get_text(separator=" ", strip=True) if comment_body else "N/A"
-                    
-                    time_tag = element.find("span", class_="comment-time")
-                    comment_time = time_tag.get_text(separator=" ", strip=True) if time_tag else "N/A"
-                    
-                    comments.append({
-                        "comment_author": comment_author,
-                        "comment_text": comment_text,
-                        "comment_time": comment_time
-                    })
-            
-            # Save to cache
-            save_to_cache(page_url, comments, "comments")
-            
-            return comments
-            
-        except Exception as e:
-            logging.error(f"Error processing comments: {e}")
-            return []
+            page_source = driver.page_source
+        record_fixture(page_url, 200, {"Content-Type": "text/html; charset=utf-8"}, page_source, rendered=True)
+        comments = parse_comments(BeautifulSoup(page_source, "lxml"))
+        
+        # Save to cache, keeping the rendered page for offline re-extraction
+        save_to_cache(page_url, sanitize_html(page_source), "rendered")
+        save_to_cache(page_url, comments, "comments")
+        
+        return comments
             
     except Exception as e:
         logging.error(f"Error getting comments: {e}")
         return []
 
+def parse_comments(soup):
+    """Parse comments from a rendered page"""
+    comments = []
+    comment_list = soup.find("div", class_="comment-list")
+    
+    if comment_list:
+        comment_elements = comment_list.find_all("table", class_="main-comment")
+        for element in comment_elements:
+            bio_div = element.find("div", class_="bio")
+            comment_author = "N/A"
+            if bio_div:
+                a_tag = bio_div.find("a", href=re.compile(r"/user/"))
+                if a_tag:
+                    comment_author = a_tag.text.strip()
+            
+            comment_body = element.find("div", class_="comment-body")
+            comment_text = comment_body.get_text(separator=" ", strip=True) if comment_body else "N/A"
+            
+            time_tag = element.find("span", class_="comment-time")
+            comment_time = time_tag.get_text(separator=" ", strip=True) if time_tag else "N/A"
+            
+            comments.append({
+                "comment_author": comment_author,
+                "comment_text": comment_text,
+                "comment_time": comment_time
+            })
+    return comments
+
 def parse_stats(soup):
     """Parse stats from BeautifulSoup object"""
     suggested_ratings = {}
@@ -645,29 +2506,56 @@ def parse_stats(soup):
         
     return suggested_ratings, None, tick_comments
 
-def get_route_stats(route_url):
-    """Get route statistics using Selenium with caching"""
+def get_route_stats(route_url, try_http=True):
+    """Get route statistics over HTTP, or with Selenium if that fails, with caching"""
+    stats_url = get_stats_url(route_url)
+    if OFFLINE:
+        # Re-parse the cached page so parser fixes apply; fall back to the parsed copy
+        stats = get_route_stats_over_http(route_url) if HTTP_FIRST else None
+        if stats is not None:
+            return stats
+        rendered = load_cache_entry(stats_url, "rendered")
+        if rendered:
+            return parse_stats(BeautifulSoup(rendered['content'], "lxml"))
+        cached_stats = get_from_cache(route_url, "stats", allow_expired=True) or {}
+        return cached_stats.get("suggested_ratings", {}), None, cached_stats.get("tick_comments", "")
+    
     # Check cache first
     cached_stats = get_from_cache(route_url, "stats")
-    if cached_stats:
+    if cached_stats is None:
+        cached_stats = get_stale_content(route_url, "stats", get_route_stats, route_url)
+    if cached_stats is not None:
         return cached_stats.get("suggested_ratings", {}), None, cached_stats.get("tick_comments", "")
     
+    stats = get_route_stats_over_http(route_url) if HTTP_FIRST and try_http else None
+    if stats is not None:
+        source_counter.add("stats:http")
+        suggested_ratings, _, tick_comments = stats
+        save_to_cache(route_url, {"suggested_ratings": suggested_ratings, "tick_comments": tick_comments}, "stats")
+        return stats
+    if USE_SELENIUM:
+        source_counter.add("stats:browser")
+    
     try:
-        stats_url = route_url.replace("/route/", "/route/stats/", 1)
         logging.debug(f"Fetching stats from {stats_url}")
         
-        driver = get_driver()
-        if not driver:
-            return {}, None, ""
+        with driver_pool.borrow() as driver:
+            if not driver:
+                return {}, None, ""
             
-        driver.get(stats_url)
-        time.sleep(1)  # Wait for page load
-        
-        content = driver.page_source
+            rate_limiter.acquire()
+            deadline = load_page(driver, stats_url)
+            # The stats tables are server-rendered; only wait for the document to load
+            if not wait_until(driver, page_loaded, deadline):
+                logging.debug(f"Stats page still loading after {SELENIUM_WAIT_TIMEOUT}s: {stats_url}")
+            
+            content = driver.page_source
+        record_fixture(stats_url, 200, {"Content-Type": "text/html; charset=utf-8"}, content, rendered=True)
         soup = BeautifulSoup(content, "lxml")
         suggested_ratings, _, tick_comments = parse_stats(soup)
         
-        # Save to cache
+        # Save to cache, keeping the rendered page for offline re-extraction
+        save_to_cache(stats_url, sanitize_html(content), "rendered")
         stats_data = {
             "suggested_ratings": suggested_ratings,
             "tick_comments": tick_comments
@@ -680,22 +2568,13 @@ def get_route_stats(route_url):
         logging.error(f"Error getting route stats: {e}")
         return {}, None, ""
 
-def get_area_comments(area_url, user_email=None, user_pass=None, cookie_file="cookies.json"):
-    return get_comments(area_url, user_email=user_email, user_pass=user_pass, cookie_file=cookie_file)
+def get_area_comments(area_url, user_email=None, user_pass=None, cookie_file="cookies.json", page=None):
+    return get_comments(area_url, user_email=user_email, user_pass=user_pass, cookie_file=cookie_file, page=page)
 
 # ==================== Route Details & Area Routes ====================
 
-def get_route_details(route_url):
-    """Get route details with caching"""
-    # Check cache first
-    cached_details = get_from_cache(route_url, "route_details")
-    if cached_details:
-        return cached_details
-    
-    response = requests.get(route_url)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, 'lxml')
-    
+def extract_route_details(soup, route_url):
+    """Extract route fields from a parsed route page (comments and stats are fetched separately)"""
     route_details = {}
     
     # Get route name from URL to find matching tr element
@@ -826,30 +2705,54 @@ def get_route_details(route_url):
     route_details['route_tags'] = []
     route_details['route_composite_tags'] = []
     
-    # Scrape route comments dynamically
-    route_details['route_comments'] = get_comments(route_url, user_email=LOGIN_EMAIL, user_pass=LOGIN_PASSWORD, cookie_file=COOKIE_FILE)
-    
-    # Fetch route stats: suggested ratings and tick comments.
-    suggested_ratings, _, tick_comments = get_route_stats(route_url)
+    return route_details
+
+def add_route_dynamic_details(route_details, route_comments, route_stats):
+    """Attach comments and stats (suggested ratings, tick comments) to extracted route details"""
+    suggested_ratings, _, tick_comments = route_stats
+    route_details['route_comments'] = route_comments
     route_details['route_suggested_ratings'] = suggested_ratings
     route_details['route_tick_comments'] = tick_comments
+    return route_details
+
+stats_executor = None
+stats_executor_lock = threading.Lock()
+
+def get_stats_executor():
+    """Threads that fetch route stats pages while the route page itself is fetched and parsed"""
+    global stats_executor
+    if stats_executor is None:
+        with stats_executor_lock:
+            if stats_executor is None:
+                stats_executor = ThreadPoolExecutor(max_workers=max(MAX_WORKERS, 1), thread_name_prefix="route-stats")
+    return stats_executor
+
+def get_route_details(route_url):
+    """Visit one route: details, comments and stats with each resource fetched once.
+
+    The stats page is requested in the background while the route page is fetched
+    and parsed, and the parsed route page is shared by the details extractor and
+    the comment parser.
+    """
+    # Nothing to wait on offline, so don't pay for the hand-off
+    stats_future = None if OFFLINE else get_stats_executor().submit(get_route_stats, route_url)
     
-    # Save to cache
-    save_to_cache(route_url, route_details, "route_details")
+    # Fields extracted from the page are cached by page content, so an unchanged
+    # (or 304 Not Modified) page is never parsed twice
+    html, _ = fetch_page(route_url)
+    page = ParsedPage(html)
+    route_details = dict(get_derived(page, route_url, "route_details", extract_route_details))
+    
+    # Scrape route comments dynamically and fetch route stats: suggested ratings and tick comments.
+    route_comments = get_comments(route_url, user_email=LOGIN_EMAIL, user_pass=LOGIN_PASSWORD, cookie_file=COOKIE_FILE,
+                                  page=page)
+    route_stats = stats_future.result() if stats_future else get_route_stats(route_url)
+    add_route_dynamic_details(route_details, route_comments, route_stats)
     
     return route_details
 
-def get_routes(area_url):
-    """Get routes with caching"""
-    # Check cache first
-    cached_area = get_from_cache(area_url, "area")
-    if cached_area:
-        return cached_area
-        
-    response = requests.get(area_url)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, 'lxml')
-    
+def extract_area_details(soup, area_url):
+    """Extract area fields from a parsed area page (comments and routes are added separately)"""
     area_name = area_url.rstrip('/').split('/')[-1]
     description_div = soup.find('div', {'class': 'fr-view'})
     area_description = description_div.get_text(strip=True) if description_div else 'N/A'
@@ -893,45 +2796,7 @@ def get_routes(area_url):
             "area_hierarchy_url": area_url
         })
 
-    area_comments = get_area_comments(area_url, user_email=LOGIN_EMAIL, user_pass=LOGIN_PASSWORD, cookie_file=COOKIE_FILE)
-    
-    routes = []
-    route_table = soup.find('table', {'id': 'left-nav-route-table'})
-    if route_table:
-        route_elements = route_table.find_all('tr')
-        valid_route_elements = [elem for elem in route_elements if elem.find('a')]
-        total_routes = len(valid_route_elements)
-        for idx, route_element in enumerate(valid_route_elements, start=1):
-            logging.info(f"    Scraping route {idx}/{total_routes}...")
-            link_tag = route_element.find('a')
-            if link_tag:
-                route_url = link_tag['href']
-                if not route_url.startswith('http'):
-                    route_url = BASE_URL + route_url
-                route_name = link_tag.get_text(strip=True)
-                
-                # Get left-to-right order and ensure it's an integer
-                route_lr = route_element.get('data-lr')
-                route_lr = int(route_lr) if route_lr is not None else 0
-                
-                # Get route details first
-                route_details = get_route_details(route_url)
-                
-                # Create final route data, ensuring route_lr is set
-                ordered_route = {
-                    "route_name": route_name, 
-                    "route_url": route_url,
-                    "route_lr": route_lr
-                }
-                
-                # Update with other details, but preserve route_lr
-                if route_details:
-                    route_details['route_lr'] = route_lr  # Ensure route_lr is preserved
-                    ordered_route.update(route_details)
-                
-                routes.append(ordered_route)
-    
-    area_data = {
+    return {
         "area_id": str(uuid.uuid4()),
         "area_url": area_url,
         "area_name": area_name,
@@ -943,15 +2808,77 @@ def get_routes(area_url):
         "area_access_issues": area_access_issues,
         "area_page_views": area_page_views,
         "area_shared_on": area_shared_on,
-        "area_comments": area_comments,
-        "routes": routes
     }
-    
-    # Save to cache
-    save_to_cache(area_url, area_data, "area")
-    
+
+def extract_route_links(soup, area_url=None):
+    """Extract the routes listed in the area's left-nav route table, in page order"""
+    route_links = []
+    route_table = soup.find('table', {'id': 'left-nav-route-table'})
+    if route_table:
+        route_elements = route_table.find_all('tr')
+        for route_element in route_elements:
+            link_tag = route_element.find('a')
+            if link_tag:
+                route_url = normalize_url(link_tag['href'], area_url)
+                
+                # Get left-to-right order and ensure it's an integer
+                route_lr = route_element.get('data-lr')
+                route_lr = int(route_lr) if route_lr is not None else 0
+                
+                route_links.append({
+                    "route_name": link_tag.get_text(strip=True),
+                    "route_url": route_url,
+                    "route_lr": route_lr
+                })
+    return route_links
+
+def extract_area_fields(soup, area_url):
+    """Everything get_routes derives from the area page itself"""
+    return {"area_details": extract_area_details(soup, area_url), "route_links": extract_route_links(soup, area_url)}
+
+# Code whose output is cached by get_derived; see get_extractor_version
+EXTRACTOR_FUNCTIONS = (extract_route_details, extract_area_details, extract_route_links, extract_area_fields,
+                       get_area_page_info, get_access_issues, clean_area_name_from_url, normalize_url)
+
+def build_route_data(route_link, route_details):
+    """Combine a route-table entry with its details, preserving the area's route_lr"""
+    ordered_route = dict(route_link)
+    if route_details:
+        ordered_route.update(route_details)
+        ordered_route['route_lr'] = route_link['route_lr']
+    return ordered_route
+
+def build_area_data(area_details, area_comments, routes):
+    """Assemble the final area record in the output schema"""
+    area_data = dict(area_details)
+    area_data["area_comments"] = area_comments
+    area_data["routes"] = routes
     return area_data
 
+def get_routes(area_url):
+    """Get routes with caching"""
+    html, _ = fetch_page(area_url)
+    # Reuse the tree parsed during discovery if the fields still need extracting
+    page = ParsedPage(html, page_store.pop(area_url))
+    area_fields = get_derived(page, area_url, "area", extract_area_fields)
+    area_details, route_links = area_fields["area_details"], area_fields["route_links"]
+    area_comments = get_area_comments(area_url, user_email=LOGIN_EMAIL, user_pass=LOGIN_PASSWORD, cookie_file=COOKIE_FILE,
+                                      page=page)
+    
+    routes = []
+    total_routes = len(route_links)
+    for idx, route_link in enumerate(route_links, start=1):
+        logging.info(f"    Scraping route {idx}/{total_routes}...")
+        try:
+            route_details = get_route_details(route_link["route_url"])
+        except OfflineCacheMiss as e:
+            # Re-extraction keeps the area and lists the route without details
+            logging.warning(f"No details for {route_link['route_url']}: {e}")
+            route_details = None
+        routes.append(build_route_data(route_link, route_details))
+    
+    return build_area_data(area_details, area_comments, routes)
+
 def safe_get_routes(url, retries=None, initial_delay=None):
     """Get routes with exponential backoff for retries"""
     # Use global defaults if not specified
@@ -976,6 +2903,8 @@ def safe_get_routes(url, retries=None, initial_delay=None):
 def get_output_filename(base_url):
     """Generate output filename from base URL"""
     area_name = base_url.rstrip('/').split('/')[-1]
+    if EXTRA_ROOTS:
+        area_name += f"_and_{EXTRA_ROOTS}_more"
     return os.path.join(OUTPUT_DIR, f"{area_name}_routes.json")
 
 def save_all_areas(all_areas, base_url):
@@ -1114,75 +3043,259 @@ def process_parallel(urls, max_workers=None):
     
     return results
 
+# --- Offline Re-extraction ---
+def init_reextract_worker(cache_dir, verbose):
+    """Configure a re-extraction worker process to read only from the cache"""
+    global CACHE_DIR, OFFLINE, USE_SELENIUM
+    CACHE_DIR = cache_dir
+    OFFLINE = True
+    USE_SELENIUM = False
+    setup_logging(verbose)
+
+def reextract_area(url):
+    """Rebuild one area from cached pages; returns (url, area_data or None)"""
+    try:
+        return url, get_routes(url)
+    except OfflineCacheMiss as e:
+        logging.warning(f"Skipping {url}: {e}")
+    except Exception as e:
+        logging.error(f"Error re-extracting {url}: {e}")
+    return url, None
+
+def process_offline(urls, max_workers=None, verbose=False):
+    """Rebuild areas from the cache across a process pool (parsing is CPU-bound, so threads don't help)"""
+    if max_workers is None:
+        max_workers = os.cpu_count() or MAX_WORKERS
+    
+    areas = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_reextract_worker,
+                             initargs=(CACHE_DIR, verbose)) as executor:
+        results = executor.map(reextract_area, urls, chunksize=max(1, len(urls) // (max_workers * 8)))
+        for url, area_data in tqdm.tqdm(results, total=len(urls), desc="Re-extracting areas"):
+            if area_data:
+                areas[url] = area_data
+    
+    # Keep discovery order so the output matches a crawl
+    return [areas[url] for url in urls if url in areas]
+
 # --- Async Functions ---
-async def async_get_html(url, session):
-    """Asynchronously fetch HTML content from URL"""
-    user_agent = get_random_user_agent()
-    headers = {"User-Agent": user_agent}
+async def async_request(url, session, semaphore=None, extra_headers=None, allow_streaming=True):
+    """Asynchronously fetch a URL through the shared limiter; returns (status, headers, text) or None"""
+    headers = {**build_request_headers(), **(extra_headers or {})}
+    user_agent = headers["User-Agent"]
     
-    if RESPECT_ROBOTS_TXT and not can_fetch(url, user_agent):
+    if not await async_can_fetch(url, user_agent):
         logging.warning(f"robots.txt disallows fetching {url}")
         return None
     
+    # The semaphore bounds in-flight HTTP requests, not whole areas, so nested
+    # route fetches can never starve the area task that spawned them
+    semaphore = semaphore or asyncio.Semaphore(1)
     try:
-        async with session.get(url, headers=headers) as response:
-            if response.status != 200:
-                logging.error(f"Error fetching {url}: {response.status}")
-                return None
-            return await response.text()
+        for attempt in range(MAX_RETRIES + 1):
+            await rate_limiter.acquire_async()
+            async with semaphore:
+                start = time.monotonic()
+                async with session.get(url, headers=headers) as response:
+                    if STREAMING_PARSE and allow_streaming and response.status == 200:
+                        fetch_stats.record(url, response.status, time.monotonic() - start, 0)
+                        rate_limiter.reward()
+                        return response.status, response.headers, await async_read_streaming_html(response, url)
+                    body = await response.read()
+                    fetch_stats.record(url, response.status, time.monotonic() - start, len(body))
+                    if response.status in THROTTLE_STATUS_CODES:
+                        rate_limiter.penalize(parse_retry_after(response.headers.get("Retry-After")))
+                        continue
+                    rate_limiter.reward()
+                    return response.status, response.headers, body.decode(response.get_encoding(), errors="replace")
+        logging.error(f"Giving up on {url} after repeated throttling")
+        return None
     except Exception as e:
         logging.error(f"Error fetching {url}: {e}")
         return None
 
-async def async_get_soup(url, session):
-    """Asynchronously get BeautifulSoup object from URL with caching"""
-    # Check cache first
-    cached_html = get_from_cache(url, "html")
-    if cached_html:
-        return BeautifulSoup(cached_html, 'lxml')
-    
-    html = await async_get_html(url, session)
-    if html:
-        # Save to cache
-        save_to_cache(url, html, "html")
-        return BeautifulSoup(html, 'lxml')
-    return None
+async def async_read_streaming_html(response, url):
+    """Asynchronous version of read_streaming_html for aiohttp responses"""
+    reader = StreamingHtmlReader()
+    nbytes = 0
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+        nbytes += len(chunk)
+        if reader.feed(chunk):
+            logging.debug(f"Stopped reading {url} early after {nbytes / 1024:.1f} KB")
+            # Don't hand a half-read connection back to the pool
+            response.close()
+            break
+    fetch_stats.add_bytes(nbytes)
+    return reader.get_html(response.charset)
 
-async def async_get_routes(url, session):
-    """Asynchronous version of get_routes"""
-    # Check cache first
-    cached_area = get_from_cache(url, "area")
-    if cached_area:
-        return cached_area
-    
-    soup = await async_get_soup(url, session)
-    if not soup:
+async def async_get_html(url, session, semaphore=None):
+    """Asynchronously fetch HTML content from URL"""
+    response = await async_request(url, session, semaphore)
+    if response is None:
         return None
+    status, _, html = response
+    if status != 200:
+        logging.error(f"Error fetching {url}: {status}")
+        return None
+    return html
+
+async def async_fetch_page(url, session, semaphore=None, allow_streaming=True):
+    """Asynchronous version of fetch_page; returns (html, not_modified) with html None on failure"""
+    cache_data = load_cache_entry(url, "html")
+    if cache_data and not is_cache_entry_expired(cache_data):
+        logging.debug(f"Cache hit for {url}")
+        return cache_data['content'], False
+    # Background refreshes run on threads through the synchronous fetch path
+    stale_html = get_stale_content(url, "html", fetch_page, url, allow_streaming=allow_streaming) if cache_data else None
+    if stale_html is not None:
+        return stale_html, False
+    
+    response = await async_request(url, session, semaphore, get_conditional_headers(cache_data), allow_streaming)
+    if response is None:
+        return None, False
+    status, headers, html = response
+    
+    if status == 304 and cache_data:
+        logging.debug(f"Not modified: {url}")
+        touch_cache(url, "html", get_response_validators(headers))
+        return cache_data['content'], True
+    if status != 200:
+        logging.error(f"Error fetching {url}: {status}")
+        return None, False
+    
+    record_fixture(url, status, headers, html)
     
-    # The rest of the function is similar to get_routes but needs to be
-    # adapted for async operations when fetching nested routes.
-    # This is a simplified version that doesn't handle nested async operations
-    
-    area_name = url.rstrip('/').split('/')[-1]
-    description_div = soup.find('div', {'class': 'fr-view'})
-    area_description = description_div.get_text(strip=True) if description_div else 'N/A'
+    # Save to cache
+    html = sanitize_html(html)
+    save_to_cache(url, html, "html", get_response_validators(headers))
+    return html, False
+
+async def async_get_soup(url, session, semaphore=None):
+    """Asynchronously get BeautifulSoup object from URL with caching"""
+    html, _ = await async_fetch_page(url, session, semaphore)
+    return BeautifulSoup(html, 'lxml') if html else None
+
+def needs_http_fetch(url, data_type):
+    """Whether the sync path would go to the network for this entry (no fresh entry, and
+    no expired one it may serve under STALE_WHILE_REVALIDATE)"""
+    if OFFLINE or not HTTP_FIRST:
+        return False
+    cache_data = load_cache_entry(url, data_type)
+    if cache_data is None:
+        return True
+    return is_cache_entry_expired(cache_data) and not STALE_WHILE_REVALIDATE
+
+async def async_get_comments(page_url, session, semaphore, page=None):
+    """Asynchronous version of get_comments.
+
+    The comments endpoint is requested through the aiohttp session (and its
+    semaphore); everything else, including the browser fallback, runs get_comments
+    in a worker thread so it can block without stalling the loop.
+    """
+    comments_url = get_comments_url(page_url)
+    try_http = True
+    if (comments_url and needs_http_fetch(page_url, "comments")
+            and (page is None or get_comments_from_page(page) is None)):
+        html, _ = await async_fetch_page(comments_url, session, semaphore, allow_streaming=False)
+        if html is not None and "comment-list" in html:
+            comments = parse_comments(BeautifulSoup(html, "lxml"))
+            source_counter.add("comments:http")
+            save_to_cache(page_url, comments, "comments")
+            return comments
+        try_http = False  # Already tried; don't request it again from the thread
+    return await asyncio.to_thread(get_comments, page_url, user_email=LOGIN_EMAIL, user_pass=LOGIN_PASSWORD,
+                                   cookie_file=COOKIE_FILE, page=page, try_http=try_http)
+
+async def async_get_route_stats(route_url, session, semaphore):
+    """Asynchronous version of get_route_stats (the stats page is fetched like in async_get_comments)"""
+    try_http = True
+    if needs_http_fetch(route_url, "stats"):
+        html, _ = await async_fetch_page(get_stats_url(route_url), session, semaphore, allow_streaming=False)
+        soup = BeautifulSoup(html, "lxml") if html is not None else None
+        if soup is not None and is_stats_page(soup):
+            suggested_ratings, _, tick_comments = parse_stats(soup)
+            source_counter.add("stats:http")
+            save_to_cache(route_url, {"suggested_ratings": suggested_ratings, "tick_comments": tick_comments}, "stats")
+            return suggested_ratings, None, tick_comments
+        try_http = False
+    return await asyncio.to_thread(get_route_stats, route_url, try_http=try_http)
+
+async def cancel_tasks(*tasks):
+    """Cancel side tasks of a failed page and wait for them, so none is left pending"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def async_get_route_details(route_url, session, semaphore):
+    """Asynchronous version of get_route_details (raises if the route page can't be fetched)"""
+    # The stats page doesn't depend on the route page and is requested straight away
+    stats_task = asyncio.ensure_future(async_get_route_stats(route_url, session, semaphore))
+    html, _ = await async_fetch_page(route_url, session, semaphore)
+    if not html:
+        await cancel_tasks(stats_task)
+        # Like fetch_page in the sync path, so the area is retried instead of listing a bare route
+        raise requests.RequestException(f"Could not fetch {route_url}")
+    
+    page = ParsedPage(html)
+    comments_task = asyncio.ensure_future(async_get_comments(route_url, session, semaphore, page=page))
     
-    # ... (rest of area info extraction would go here) ...
+    try:
+        route_details = dict(get_derived(page, route_url, "route_details", extract_route_details))
+    except Exception:
+        await cancel_tasks(comments_task, stats_task)
+        raise
+    route_comments, route_stats = await asyncio.gather(comments_task, stats_task)
+    add_route_dynamic_details(route_details, route_comments, route_stats)
     
-    # This is a simplified result - a full implementation would need to handle route extraction
-    area_data = {
-        "area_id": str(uuid.uuid4()),
-        "area_url": url,
-        "area_name": area_name,
-        "area_description": area_description,
-        # ... other fields would be filled in here ...
-        "routes": []  # This would be populated in the full implementation
-    }
+    return route_details
+
+async def async_get_routes(url, session, semaphore=None):
+    """Asynchronous version of get_routes"""
+    semaphore = semaphore or asyncio.Semaphore(MAX_WORKERS)
+    html, _ = await async_fetch_page(url, session, semaphore)
+    if not html:
+        raise requests.RequestException(f"Could not fetch {url}")
+    
+    # Reuse the tree parsed during discovery if the fields still need extracting
+    page = ParsedPage(html, page_store.pop(url))
+    comments_task = asyncio.ensure_future(async_get_comments(url, session, semaphore, page=page))
+    area_fields = get_derived(page, url, "area", extract_area_fields)
+    area_details, route_links = area_fields["area_details"], area_fields["route_links"]
+    logging.info(f"Fetching {len(route_links)} routes concurrently for {url}")
+    
+    all_details = await asyncio.gather(
+        *(async_get_route_details(link["route_url"], session, semaphore) for link in route_links),
+        return_exceptions=True
+    )
     
-    # Save to cache
-    save_to_cache(url, area_data, "area")
+    routes = []
+    for route_link, route_details in zip(route_links, all_details):
+        if isinstance(route_details, Exception):
+            # Same as the sync path: a failed route fails the area so it can be retried
+            await cancel_tasks(comments_task)
+            raise route_details
+        routes.append(build_route_data(route_link, route_details))
+    
+    return build_area_data(area_details, await comments_task, routes)
+
+async def async_safe_get_routes(url, session, semaphore, retries=None, initial_delay=None):
+    """Asynchronous version of safe_get_routes"""
+    retries = MAX_RETRIES if retries is None else retries
+    initial_delay = REQUEST_DELAY if initial_delay is None else initial_delay
     
-    return area_data
+    for attempt in range(1, retries + 1):
+        try:
+            return await async_get_routes(url, session, semaphore)
+        except Exception as e:
+            backoff_delay = initial_delay * (RETRY_BACKOFF_FACTOR ** (attempt - 1))
+            logging.error(f"Error processing {url} (attempt {attempt}/{retries}): {e}")
+            
+            if attempt < retries:
+                logging.info(f"Retrying in {backoff_delay:.2f} seconds...")
+                await asyncio.sleep(backoff_delay)
+            else:
+                logging.error("All retry attempts failed.")
+    return None
 
 async def process_async(urls, concurrency=None):
     """Process URLs using asyncio with controlled concurrency"""
@@ -1191,44 +3304,153 @@ async def process_async(urls, concurrency=None):
     
     results = []
     
-    # Create a semaphore to limit concurrency
+    # Create a semaphore to limit in-flight requests
     semaphore = asyncio.Semaphore(concurrency)
     
-    async def fetch_with_semaphore(url):
-        async with semaphore:
-            # Add delay for rate limiting
-            await asyncio.sleep(REQUEST_DELAY)
-            async with aiohttp.ClientSession() as session:
-                return await async_get_routes(url, session)
-    
-    # Create tasks for all URLs
-    tasks = [fetch_with_semaphore(url) for url in urls]
-    
-    # Process tasks with progress tracking
-    for i, task in enumerate(asyncio.as_completed(tasks), 1):
-        try:
-            area_data = await task
-            if area_data:
-                results.append(area_data)
-            if i % 10 == 0:  # Log progress every 10 areas
-                logging.info(f"Processed {i}/{len(urls)} areas")
-        except Exception as e:
-            logging.error(f"Error in async processing: {e}")
+    # One pooled session (keep-alive connections) for the whole run
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # Create tasks for all URLs
+        tasks = [async_safe_get_routes(url, session, semaphore) for url in urls]
+        
+        # Process tasks with progress tracking
+        for i, task in enumerate(asyncio.as_completed(tasks), 1):
+            try:
+                area_data = await task
+                if area_data:
+                    results.append(area_data)
+                if i % 10 == 0:  # Log progress every 10 areas
+                    logging.info(f"Processed {i}/{len(urls)} areas")
+            except Exception as e:
+                logging.error(f"Error in async processing: {e}")
     
     return results
 
+def print_cache_stats():
+    """Print a per data_type summary of the cache"""
+    db_path = os.path.join(CACHE_DIR, CACHE_DB_NAME)
+    rows = get_cache_store().stats()
+    print(f"{'data_type':<15}{'entries':>10}{'MB':>10}{'expired':>10}  {'oldest':<20}{'newest':<20}encodings")
+    for data_type, count, size, oldest, newest, expired, encodings in rows:
+        oldest = datetime.datetime.fromtimestamp(oldest).strftime('%Y-%m-%d %H:%M')
+        newest = datetime.datetime.fromtimestamp(newest).strftime('%Y-%m-%d %H:%M')
+        print(f"{data_type:<15}{count:>10}{size / 1048576:>10.1f}{expired:>10}  {oldest:<20}{newest:<20}{encodings}")
+    disk = sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+    print(f"\nDatabase {db_path}: {disk / 1048576:.1f} MB on disk")
+
+def cache_main(argv):
+    """Cache maintenance commands: scrape_mtnpj_working.py cache <command> [options]"""
+    global CACHE_DIR
+    parser = argparse.ArgumentParser(prog='scrape_mtnpj_working.py cache', description='Manage the scrape cache')
+    parser.add_argument('--cache-dir', type=str, default=CACHE_DIR, help='Cache directory')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help='Import the old one-file-per-URL JSON cache into the SQLite store')
+    train = commands.add_parser('train-dict', help='Train a zstd dictionary on cached entries and recompress them')
+    train.add_argument('--data-type', choices=CACHE_DATA_TYPES, default='html', help='Entries to train on')
+    train.add_argument('--samples', type=int, default=CACHE_DICT_SAMPLES, help='Number of entries to sample')
+    train.add_argument('--dict-size', type=int, default=CACHE_DICT_SIZE, help='Dictionary size in bytes')
+    train.add_argument('--no-recompress', action='store_true', help='Only use the dictionary for new entries')
+    gc = commands.add_parser('gc', help='Delete old entries and evict least recently used ones over the size cap')
+    gc.add_argument('--data-type', choices=CACHE_DATA_TYPES, action='append',
+                    help='Only collect this data type (repeatable; default all)')
+    gc.add_argument('--max-age-days', type=float, default=None, help='Override the per-type maximum age')
+    gc.add_argument('--max-mb', type=float, default=None, help='Override the per-type size cap')
+    gc.add_argument('--vacuum', action='store_true', help='Run a full VACUUM afterwards (slow, needs free disk)')
+    gc.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+    commands.add_parser('stats', help='Show entry counts, sizes and ages per data type')
+    export = commands.add_parser('export', help='Pack cache entries into a checksummed archive for another host')
+    export.add_argument('archive', help='Output file (.jsonl.gz)')
+    export.add_argument('--data-type', choices=CACHE_DATA_TYPES, action='append',
+                        help='Only export this data type (repeatable; default all)')
+    export.add_argument('--root', action='append', help='Only export pages cached under this area URL (repeatable)')
+    import_parser = commands.add_parser('import', help='Merge an exported archive, keeping the newer entry on conflicts')
+    import_parser.add_argument('archive', help='Archive written by "cache export"')
+    
+    args = parser.parse_args(argv)
+    setup_logging(args.verbose)
+    CACHE_DIR = args.cache_dir
+    
+    if args.command == 'migrate':
+        imported = migrate_json_cache()
+        logging.info(f"Imported {imported} entries into {os.path.join(CACHE_DIR, CACHE_DB_NAME)}")
+    elif args.command == 'train-dict':
+        if zstandard is None:
+            logging.error("The zstandard package is required: pip install zstandard")
+            sys.exit(1)
+        store = get_cache_store()
+        try:
+            dict_id = store.train_dictionary(args.data_type, args.samples, args.dict_size)
+        except (ValueError, zstandard.ZstdError) as e:
+            logging.error(f"Could not train a dictionary: {e}")
+            sys.exit(1)
+        logging.info(f"Trained dictionary {dict_id} for {args.data_type} entries")
+        if not args.no_recompress:
+            old_bytes, new_bytes = store.recompress(args.data_type)
+            ratio = old_bytes / new_bytes if new_bytes else 0.0
+            logging.info(f"Recompressed {args.data_type}: {old_bytes / 1048576:.1f} MB -> "
+                         f"{new_bytes / 1048576:.1f} MB ({ratio:.1f}x)")
+    elif args.command == 'gc':
+        results = collect_cache_garbage(args.data_type, args.max_age_days, args.max_mb,
+                                        dry_run=args.dry_run, vacuum=args.vacuum)
+        verb = "Would delete" if args.dry_run else "Deleted"
+        for data_type, (deleted, freed) in results.items():
+            print(f"{verb} {deleted} {data_type} entries ({freed / 1048576:.1f} MB)")
+    elif args.command == 'stats':
+        print_cache_stats()
+    elif args.command == 'export':
+        count = export_cache(args.archive, args.data_type, args.root)
+        logging.info(f"Exported {count} entries to {args.archive}")
+    elif args.command == 'import':
+        try:
+            read, stored = import_cache(args.archive)
+        except (ValueError, OSError, EOFError) as e:
+            logging.error(f"Import failed, nothing was changed: {e}")
+            sys.exit(1)
+        logging.info(f"Imported {stored} of {read} entries from {args.archive} (the rest were not newer)")
+
 def main():
+    global CACHE_DIR, CACHE_EXPIRY_DAYS, PAGE_STORE_MAX_PAGES, MEMORY_CACHE_MAX_MB, SELENIUM_WAIT_TIMEOUT, DRIVER_MAX_PAGES, DRIVER_MAX_RSS_MB, BROWSER_PROFILE, REQUEST_DELAY, REQUESTS_PER_SECOND, BURST_SIZE, MAX_RETRIES, BATCH_SIZE, MAX_WORKERS, RESPECT_ROBOTS_TXT, CHECKPOINT_FILE
+    
+    # Cache maintenance has its own sub-commands
+    if len(sys.argv) > 1 and sys.argv[1] == 'cache':
+        cache_main(sys.argv[2:])
+        return
+    
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Scrape Mountain Project routes')
-    parser.add_argument('url', help='Base URL to scrape')
+    parser.add_argument('url', nargs='+', help='Base URL(s) to scrape; several roots are crawled together fairly')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
     parser.add_argument('--cache-days', type=int, default=7, help='Cache expiry in days')
     parser.add_argument('--no-cache', action='store_true', help='Disable caching')
+    parser.add_argument('--cache-dir', type=str, default=CACHE_DIR, help='Directory holding the cache database')
     parser.add_argument('--batch-size', type=int, default=10, help='Number of areas to process in each batch')
     parser.add_argument('--request-delay', type=float, default=1.0, help='Delay between requests in seconds')
+    parser.add_argument('--requests-per-second', type=float, default=None,
+                     help='Shared request rate across all workers (overrides --request-delay)')
+    parser.add_argument('--burst', type=int, default=1, help='Number of requests allowed back-to-back before throttling')
     parser.add_argument('--max-retries', type=int, default=3, help='Maximum number of retries for failed requests')
     parser.add_argument('--max-workers', type=int, default=4, help='Maximum number of concurrent workers')
+    parser.add_argument('--concurrency', type=int, default=None,
+                     help='Maximum in-flight requests in async mode (defaults to --max-workers)')
     parser.add_argument('--no-robots', action='store_true', help='Disable robots.txt checking')
+    parser.add_argument('--no-selenium', action='store_true',
+                     help='Do not start a browser; comments and stats are left empty unless cached')
+    parser.add_argument('--browser-only', action='store_true',
+                     help='Always use the browser for comments and stats instead of trying plain HTTP first')
+    parser.add_argument('--browsers', type=int, default=None,
+                     help='Headless browsers shared by the workers (defaults to --max-workers, or a lower --concurrency in async mode)')
+    parser.add_argument('--driver-max-pages', type=int, default=DRIVER_MAX_PAGES,
+                     help='Restart each browser after this many pages (0 to never restart)')
+    parser.add_argument('--browser-profile', choices=BROWSER_PROFILES, default=BROWSER_PROFILE,
+                     help='lean blocks images, fonts, ads and analytics and stops waiting at DOMContentLoaded; full loads everything')
+    parser.add_argument('--driver-max-mb', type=float, default=DRIVER_MAX_RSS_MB,
+                     help='Restart a browser once its processes use this much memory (0 to disable; needs psutil)')
+    parser.add_argument('--selenium-timeout', type=float, default=SELENIUM_WAIT_TIMEOUT,
+                     help='Longest time in seconds the browser spends on each page, loading plus waiting for rendered content')
+    parser.add_argument('--record-fixtures', type=str, default=None,
+                     help='Append every response to this gzip JSON-lines archive for scraping/replay_server.py')
     parser.add_argument('--no-resume', action='store_true', help='Do not resume from checkpoint')
     parser.add_argument('--checkpoint-file', type=str, default='checkpoint.json', help='Path to checkpoint file')
     parser.add_argument('--mode', choices=['sequential', 'parallel', 'async'], default='sequential',
@@ -1237,6 +3459,22 @@ def main():
                      help='Skip area discovery and directly process the provided URL as a lowest-level area')
     parser.add_argument('--fast-discovery', action='store_true',
                      help='Use parallel processing for faster area discovery')
+    parser.add_argument('--crawl-order', choices=CRAWL_ORDERS, default='dfs',
+                     help='Discovery order: dfs (link order), depth (shallow areas first) or page-views (popular areas first)')
+    parser.add_argument('--streaming-parse', action='store_true',
+                     help='Parse pages while they download and stop reading once the extracted fields are in')
+    parser.add_argument('--page-store-size', type=int, default=100,
+                     help='Parsed leaf-area pages kept in memory between discovery and extraction (0 to disable)')
+    parser.add_argument('--memory-cache-mb', type=float, default=MEMORY_CACHE_MAX_MB,
+                     help='Memory for decoded cache entries in front of the cache database (0 to disable)')
+    parser.add_argument('--reextract', action='store_true',
+                     help='Rebuild the output from cached pages only (no network, no browser) across a process pool')
+    parser.add_argument('--processes', type=int, default=None,
+                     help='Worker processes for --reextract (defaults to the CPU count)')
+    parser.add_argument('--keep-full-html', action='store_true',
+                     help='Cache pages exactly as received instead of stripping what the extractors never read')
+    parser.add_argument('--stale-while-revalidate', action='store_true',
+                     help='Use expired cache entries immediately and refresh them in the background')
     
     args = parser.parse_args()
     
@@ -1244,46 +3482,98 @@ def main():
     setup_logging(args.verbose)
     
     # Set global configurations
-    global CACHE_EXPIRY_DAYS, REQUEST_DELAY, MAX_RETRIES, BATCH_SIZE, MAX_WORKERS, RESPECT_ROBOTS_TXT, CHECKPOINT_FILE
+    CACHE_DIR = args.cache_dir
     CACHE_EXPIRY_DAYS = 0 if args.no_cache else args.cache_days
     REQUEST_DELAY = args.request_delay
+    REQUESTS_PER_SECOND = args.requests_per_second
+    BURST_SIZE = args.burst
     MAX_RETRIES = args.max_retries
     BATCH_SIZE = args.batch_size
     MAX_WORKERS = args.max_workers
     RESPECT_ROBOTS_TXT = not args.no_robots
     CHECKPOINT_FILE = args.checkpoint_file
     
+    # One token bucket paces every fetch path (threads, async, discovery, Selenium)
+    if REQUESTS_PER_SECOND is None:
+        REQUESTS_PER_SECOND = 1.0 / REQUEST_DELAY if REQUEST_DELAY > 0 else 1000.0
+    rate_limiter.configure(REQUESTS_PER_SECOND, BURST_SIZE)
+    logging.info(f"Rate limit: {REQUESTS_PER_SECOND:.2f} requests/second (burst {BURST_SIZE})")
+    fetch_stats.reset()
+    PAGE_STORE_MAX_PAGES = args.page_store_size
+    page_store.max_entries = PAGE_STORE_MAX_PAGES
+    MEMORY_CACHE_MAX_MB = args.memory_cache_mb
+    memory_cache.max_entries = MEMORY_CACHE_MAX_ENTRIES if MEMORY_CACHE_MAX_MB > 0 else 0
+    memory_cache.max_bytes = int(MEMORY_CACHE_MAX_MB * 1048576)
+    
     if not args.url:
         logging.error("Please provide area URL as argument")
         sys.exit(1)
         
-    global BASE_URL
-    BASE_URL = args.url
+    global BASE_URL, CRAWL_ORDER, EXTRA_ROOTS, STREAMING_PARSE, USE_SELENIUM, SELENIUM_POOL_SIZE, OFFLINE, STALE_WHILE_REVALIDATE, KEEP_FULL_HTML, HTTP_FIRST, fixture_recorder
+    root_urls = [normalize_url(url) for url in args.url]
+    BASE_URL = root_urls[0]
+    EXTRA_ROOTS = len(root_urls) - 1
+    CRAWL_ORDER = args.crawl_order
+    STREAMING_PARSE = args.streaming_parse
+    USE_SELENIUM = not args.no_selenium
+    STALE_WHILE_REVALIDATE = args.stale_while_revalidate
+    KEEP_FULL_HTML = args.keep_full_html
+    SELENIUM_WAIT_TIMEOUT = args.selenium_timeout
+    BROWSER_PROFILE = args.browser_profile
+    # A browser per worker, so the Selenium fallback scales with the rest of the pipeline. Async
+    # --concurrency is requests in flight, which can be far more Chromes than the box can run
+    SELENIUM_POOL_SIZE = MAX_WORKERS
+    if args.mode == 'async' and args.concurrency:
+        SELENIUM_POOL_SIZE = min(args.concurrency, MAX_WORKERS)
+    SELENIUM_POOL_SIZE = args.browsers or SELENIUM_POOL_SIZE
+    DRIVER_MAX_PAGES = args.driver_max_pages
+    # Launched lazily, but even a sequential run can use more than one: background stats
+    # fetches (see get_stats_executor) borrow browsers alongside the one loading comments
+    driver_pool.size = SELENIUM_POOL_SIZE
+    driver_pool.max_pages = DRIVER_MAX_PAGES
+    DRIVER_MAX_RSS_MB = args.driver_max_mb
+    driver_pool.max_rss_mb = DRIVER_MAX_RSS_MB
+    HTTP_FIRST = not args.browser_only
+    if args.reextract:
+        logging.info("Re-extracting from the cache only; uncached pages are skipped")
+        OFFLINE = True
+        USE_SELENIUM = False
+        page_store.max_entries = 0  # Parsed trees can't be handed to worker processes
+    if DRIVER_MAX_RSS_MB and USE_SELENIUM and psutil is None:
+        logging.warning("psutil is not installed; browsers are only recycled by page count")
+    if args.record_fixtures:
+        fixture_recorder = FixtureRecorder(args.record_fixtures)
+        logging.info(f"Recording responses to {args.record_fixtures}")
     
     # Skip discovery if requested and directly process the URL
     if args.skip_discovery:
-        logging.info(f"Skipping discovery and directly processing URL: {BASE_URL}")
-        lowest_level_urls = [BASE_URL]
+        logging.info(f"Skipping discovery and directly processing URL(s): {', '.join(root_urls)}")
+        lowest_level_urls = list(root_urls)
     else:
-        logging.info(f"Finding all lowest-level areas in {BASE_URL}...")
+        logging.info(f"Finding all lowest-level areas in {', '.join(root_urls)}...")
         # Get lowest level areas - using fast discovery if requested
         if args.fast_discovery:
             logging.info(f"Using parallel discovery with {MAX_WORKERS} workers")
-            lowest_level_urls = scrape_lowest_level_areas_parallel(BASE_URL, max_workers=MAX_WORKERS)
+            lowest_level_urls = []
+            for root_url in root_urls:
+                lowest_level_urls.extend(scrape_lowest_level_areas_parallel(root_url, max_workers=MAX_WORKERS))
         else:
-            lowest_level_urls = scrape_lowest_level_areas(BASE_URL)
+            lowest_level_urls = scrape_lowest_level_areas(root_urls, order=CRAWL_ORDER)
         logging.info(f"Found {len(lowest_level_urls)} lowest-level areas")
     
     try:
-        if args.mode == 'parallel':
+        if args.reextract:
+            logging.info("Re-extracting areas from cached pages...")
+            all_areas = process_offline(lowest_level_urls, max_workers=args.processes, verbose=args.verbose)
+        elif args.mode == 'parallel':
             # Process in parallel using threads
             logging.info(f"Processing areas in parallel with {MAX_WORKERS} workers...")
             all_areas = process_parallel(lowest_level_urls, max_workers=MAX_WORKERS)
         elif args.mode == 'async':
             # Process using asyncio
-            logging.info(f"Processing areas asynchronously with concurrency {MAX_WORKERS}...")
-            loop = asyncio.get_event_loop()
-            all_areas = loop.run_until_complete(process_async(lowest_level_urls, concurrency=MAX_WORKERS))
+            concurrency = args.concurrency or MAX_WORKERS
+            logging.info(f"Processing areas asynchronously with concurrency {concurrency}...")
+            all_areas = asyncio.run(process_async(lowest_level_urls, concurrency=concurrency))
         else:
             # Process in batches with checkpointing (sequential mode)
             logging.info(f"Processing areas sequentially in batches of {BATCH_SIZE}...")
@@ -1296,7 +3586,19 @@ def main():
         
         # Save final results
         save_all_areas(all_areas, BASE_URL)
+        # Output is written; let the background refreshes catch the cache up before exiting
+        revalidation_queue.drain()
     finally:
+        if STALE_WHILE_REVALIDATE:
+            logging.info(f"Background refreshes: {revalidation_queue.summary()}")
+        logging.info(f"Fetch stats: {fetch_stats.summary()}")
+        logging.info(f"Memory cache: {memory_cache.summary()}")
+        logging.info(f"Page store: {page_store.summary()}")
+        logging.info(f"Comment and stats sources: {source_counter.summary()}")
+        if USE_SELENIUM:
+            logging.info(f"Browsers: {driver_pool.summary()}")
+        if fixture_recorder is not None:
+            logging.info(f"Recorded {fixture_recorder.count} responses to {fixture_recorder.path}")
         # Clean up resources
         cleanup_driver()
 